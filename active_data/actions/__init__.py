@@ -15,6 +15,7 @@ from flask import Response
 from future.utils import text_type
 
 from active_data import record_request
+from active_data.admission import QUERY_TOO_BUSY
 from active_data.actions import save_query
 from jx_base import STRUCT
 from jx_python import meta
@@ -34,6 +35,8 @@ def send_error(active_data_timer, body, e):
 
     if QUERY_TOO_LARGE in e:
         status = 413
+    elif QUERY_TOO_BUSY in e:
+        status = 429
 
     record_request(flask.request, None, body, e)
     Log.warning("Could not process\n{{body}}", body=body.decode("latin1"), cause=e)
@@ -111,6 +114,8 @@ def test_mode_wait(query):
         for c in cols:
             Log.note("Mark {{column.names}} dirty at {{time}}", column=c, time=now)
             c.last_updated = now - m.too_old
+            with m.meta.columns.locker:
+                m.meta.columns.touch(c)
             m.todo.push(c)
 
         while end_time > now:
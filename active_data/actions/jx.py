@@ -10,28 +10,44 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import unicode_literals
 
+import socket
+from select import select
+from time import time
+
 import flask
 from flask import Response
 
-from active_data import record_request, cors_wrapper
-from active_data.actions import save_query, send_error, test_mode_wait, QUERY_TOO_LARGE
+from active_data import record_request, cors_wrapper, admission, coalesce
+from active_data.admission import waited_too_long
+from active_data.actions import save_query, send_error, test_mode_wait, QUERY_TOO_LARGE, metrics, profile
 from jx_base.container import Container
+from jx_elasticsearch.es52 import ES52, query_batch
+from jx_elasticsearch.es52.aggs import is_aggsop
+from jx_elasticsearch.es52.cost import estimate_cost, DEFAULT_COST
+from jx_elasticsearch.es52.deep import is_deepop
 from jx_python import jx, wrap_from
+from mo_dots import split_field, Null
+from mo_dots.lists import FlatList
+from mo_future import text_type
 from mo_files import File
 from mo_logs import Log
 from mo_logs.exceptions import Except
-from mo_logs.profiles import CProfiler
 from mo_math import Math
+from mo_threads import Thread, Till
 from mo_times.timer import Timer
 from pyLibrary import convert
+from pyLibrary.env.elasticsearch import Deadline
 
 BLANK = convert.unicode2utf8(File("active_data/public/error.html").read())
 QUERY_SIZE_LIMIT = 10*1024*1024
+BATCH_SIZE_LIMIT = 100  # MAXIMUM NUMBER OF QUERIES IN ONE /query/batch REQUEST
+MAX_TIMEOUT = 9 * 60  # SECONDS; LESS THAN THE gunicorn timeout, SO WE CANCEL THE ES TASKS BEFORE THE WORKER IS KILLED
 
 
 @cors_wrapper
 def jx_query(path):
-    with CProfiler():
+    with profile.endpoint("query"):
+        data = Null
         try:
             with Timer("total duration") as query_timer:
                 preamble_timer = Timer("preamble")
@@ -55,49 +71,320 @@ def jx_query(path):
                     if data.meta.testing:
                         test_mode_wait(data)
 
-                translate_timer = Timer("translate")
-                with translate_timer:
+                if coalesce.coalescer:
+                    # IDENTICAL QUERIES ALREADY RUNNING ARE NOT RUN AGAIN; WE WAIT FOR THEIR RESPONSE
+                    with Timer("coalesce", silent=True) as wait_timer:
+                        (content_type, response_data), coalesced = coalesce.coalescer.run(
+                            _coalesce_key(data),
+                            lambda: _execute(data, query_timer, preamble_timer),
+                            _timeout(data)
+                        )
+                    if coalesced:
+                        metrics.record("coalesced", _index_name(data), wait=wait_timer.duration.seconds)
+                        Log.note("Coalesced with an identical query, {{num}} bytes in {{duration}}", num=len(response_data), duration=query_timer.duration)
+                else:
+                    content_type, response_data = _execute(data, query_timer, preamble_timer)
+
+            return Response(
+                response_data,
+                status=200,
+                headers={
+                    "Content-Type": content_type
+                }
+            )
+        except Exception, e:
+            e = Except.wrap(e)
+            metrics.record("error", _index_name(data), total=query_timer.duration.seconds)
+            return send_error(query_timer, request_body, e)
+
+
+def _execute(data, query_timer, preamble_timer):
+    """
+    RUN THE QUERY
+    :return: (content_type, content) WHERE content IS BYTES
+    """
+    translate_timer = Timer("translate")
+    with translate_timer:
+        with Deadline(seconds=_timeout(data)) as deadline:
+            with _watch_client(deadline):
+                with Timer("container") as container_timer:
                     frum = wrap_from(data['from'])
+                query_type = "other"
+                if isinstance(frum, ES52):
+                    query = frum._normalize(data)
+                    query_type = _query_type(frum, query)
+                    if admission.scheduler:
+                        # ESTIMATE THE COST BEFORE ES SEES THE QUERY, AND WAIT OUR TURN
+                        with admission.scheduler.enter(_cluster_key(frum), _estimate_cost(query)):
+                            result = jx.run(query, frum=frum)
+                    else:
+                        result = jx.run(query, frum=frum)
+                else:
                     result = jx.run(data, frum=frum)
 
-                    if isinstance(result, Container):  #TODO: REMOVE THIS CHECK, jx SHOULD ALWAYS RETURN Containers
-                        result = result.format(data.format)
-
-                save_timer = Timer("save")
-                with save_timer:
-                    if data.meta.save:
-                        try:
-                            result.meta.saved_as = save_query.query_finder.save(data)
-                        except Exception, e:
-                            Log.warning("Unexpected save problem", cause=e)
-
-                result.meta.timing.preamble = Math.round(preamble_timer.duration.seconds, digits=4)
-                result.meta.timing.translate = Math.round(translate_timer.duration.seconds, digits=4)
-                result.meta.timing.save = Math.round(save_timer.duration.seconds, digits=4)
-                result.meta.timing.total = "{{TOTAL_TIME}}"  # TIMING PLACEHOLDER
-
-                with Timer("jsonification") as json_timer:
-                    response_data = convert.unicode2utf8(convert.value2json(result))
-
-            with Timer("post timer"):
-                # IMPORTANT: WE WANT TO TIME OF THE JSON SERIALIZATION, AND HAVE IT IN THE JSON ITSELF.
-                # WE CHEAT BY DOING A (HOPEFULLY FAST) STRING REPLACEMENT AT THE VERY END
-                timing_replacement = (
-                    b'"total":' + str(Math.round(query_timer.duration.seconds, digits=4)) +
-                    b', "jsonification":' + str(Math.round(json_timer.duration.seconds, digits=4))
-                )
-                response_data = response_data.replace(b'"total":"{{TOTAL_TIME}}"', timing_replacement)
-                Log.note("Response is {{num}} bytes in {{duration}}", num=len(response_data), duration=query_timer.duration)
-
-                return Response(
-                    response_data,
-                    status=200,
-                    headers={
-                        "Content-Type": result.meta.content_type
-                    }
-                )
+        if isinstance(result, Container):  #TODO: REMOVE THIS CHECK, jx SHOULD ALWAYS RETURN Containers
+            result = result.format(data.format)
+
+    save_timer = Timer("save")
+    with save_timer:
+        if data.meta.save:
+            try:
+                result.meta.saved_as = save_query.query_finder.save(data)
+            except Exception, e:
+                Log.warning("Unexpected save problem", cause=e)
+
+    result.meta.timing.preamble = Math.round(preamble_timer.duration.seconds, digits=4)
+    result.meta.timing.translate = Math.round(translate_timer.duration.seconds, digits=4)
+    result.meta.timing.save = Math.round(save_timer.duration.seconds, digits=4)
+    result.meta.timing.total = "{{TOTAL_TIME}}"  # TIMING PLACEHOLDER
+
+    with Timer("jsonification") as json_timer:
+        response_data = convert.unicode2utf8(convert.value2json(result))
+
+    container_time = container_timer.duration.seconds
+    metrics.record(
+        query_type,
+        _index_name(data),
+        parse=preamble_timer.duration.seconds,
+        container=container_time,
+        es=deadline.round_trip,
+        decode=deadline.decode,
+        format=max(0, translate_timer.duration.seconds - container_time - deadline.round_trip - deadline.decode),
+        serialize=json_timer.duration.seconds
+    )
+
+    with Timer("post timer"):
+        # IMPORTANT: WE WANT TO TIME OF THE JSON SERIALIZATION, AND HAVE IT IN THE JSON ITSELF.
+        # WE CHEAT BY DOING A (HOPEFULLY FAST) STRING REPLACEMENT AT THE VERY END
+        timing_replacement = (
+            b'"total":' + str(Math.round(query_timer.duration.seconds, digits=4)) +
+            b', "jsonification":' + str(Math.round(json_timer.duration.seconds, digits=4))
+        )
+        response_data = response_data.replace(b'"total":"{{TOTAL_TIME}}"', timing_replacement)
+        Log.note("Response is {{num}} bytes in {{duration}}", num=len(response_data), duration=query_timer.duration)
+
+    return result.meta.content_type, response_data
+
+
+@cors_wrapper
+def jx_batch(path):
+    """
+    EXPECTING A JSON ARRAY OF QUERIES, RESPOND WITH AN ARRAY OF RESULTS, IN THE SAME ORDER
+    A QUERY THAT FAILS HAS ITS ERROR IN PLACE OF ITS RESULT; THE OTHERS ARE UNAFFECTED
+    """
+    with profile.endpoint("batch"):
+        request_body = b""
+        try:
+            with Timer("total duration") as query_timer:
+                if flask.request.headers.get("content-length", "") in ["", "0"]:
+                    Log.error("Expecting a JSON array of queries")
+                elif int(flask.request.headers["content-length"]) > QUERY_SIZE_LIMIT:
+                    Log.error(QUERY_TOO_LARGE)
+
+                request_body = flask.request.get_data().strip()
+                queries = convert.json2value(convert.utf82unicode(request_body))
+                if not isinstance(queries, FlatList):
+                    Log.error("Expecting a JSON array of queries")
+                elif len(queries) > BATCH_SIZE_LIMIT:
+                    Log.error("Expecting no more than {{limit}} queries in a batch", limit=BATCH_SIZE_LIMIT)
+                record_request(flask.request, queries, None, None)
+
+                with Deadline(seconds=MAX_TIMEOUT) as deadline:
+                    with _watch_client(deadline):
+                        results = _run_batch(queries)
+
+                with Timer("jsonification"):
+                    response_data = convert.unicode2utf8(convert.value2json(results))
+            Log.note("Batch of {{num}} queries is {{bytes}} bytes in {{duration}}", num=len(queries), bytes=len(response_data), duration=query_timer.duration)
+
+            return Response(
+                response_data,
+                status=200,
+                headers={
+                    "Content-Type": "application/json"
+                }
+            )
         except Exception, e:
             e = Except.wrap(e)
+            metrics.record("error", "other", total=query_timer.duration.seconds)
             return send_error(query_timer, request_body, e)
 
 
+def _run_batch(queries):
+    """
+    :param queries: LIST OF jx QUERIES
+    :return: LIST OF FORMATTED RESULTS, OR ERRORS
+    """
+    start = time()
+    containers = {}  # EACH DISTINCT from IS SETUP ONCE
+    results = [None] * len(queries)
+    es_batch = []  # LIST OF (position, container, query) TO SEND IN ONE _msearch
+    for i, data in enumerate(queries):
+        try:
+            if data.meta.testing:
+                test_mode_wait(data)
+
+            key = convert.value2json(data["from"])
+            frum = containers.get(key)
+            if frum is None:
+                frum = containers[key] = wrap_from(data["from"])
+
+            if isinstance(frum, ES52):
+                es_batch.append((i, frum, data))
+            else:
+                results[i] = jx.run(data, frum=frum)
+        except Exception as e:
+            results[i] = Except.wrap(e)
+
+    # EACH QUERY IS ADMITTED ON ITS OWN; THOSE ADMITTED TOGETHER SHARE THE _msearch
+    scheduler = admission.scheduler
+    pending = []  # LIST OF (position, container, query, ticket)
+    if scheduler and es_batch:
+        requests = []
+        for i, frum, data in es_batch:
+            try:
+                cost = _estimate_cost(frum._normalize(data))
+            except Exception:
+                cost = DEFAULT_COST  # THE QUERY WILL REPORT ITS OWN PROBLEM WHEN IT RUNS
+            requests.append((_cluster_key(frum), cost))
+        for (i, frum, data), ticket in zip(es_batch, scheduler.enter_batch(requests)):
+            if isinstance(ticket, Except):
+                results[i] = ticket
+            else:
+                pending.append((i, frum, data, ticket))
+    else:
+        pending = [(i, frum, data, None) for i, frum, data in es_batch]
+
+    try:
+        while pending:
+            ready = [p for p in pending if p[3] is None or p[3].state == "running"]
+            if not ready:
+                for ticket in scheduler.wait_any([t for _, _, _, t in pending]):
+                    i = [p[0] for p in pending if p[3] is ticket][0]
+                    results[i] = waited_too_long(ticket, scheduler.settings.max_wait)
+                pending = [p for p in pending if results[p[0]] is None]
+                continue
+
+            pending = [p for p in pending if not (p[3] is None or p[3].state == "running")]
+            try:
+                for (i, _, _, _), result in zip(ready, query_batch([(frum, data) for _, frum, data, _ in ready])):
+                    results[i] = result
+            finally:
+                for _, _, _, ticket in ready:
+                    if ticket:
+                        ticket.release()
+    finally:
+        for _, _, _, ticket in pending:
+            if ticket:
+                ticket.release()
+
+    failed = set()
+    for i, (data, result) in enumerate(zip(queries, results)):
+        try:
+            if isinstance(result, Except):
+                Log.warning("Could not process batch query {{num}}", num=i, cause=result)
+                results[i] = result.__data__()
+                failed.add(i)
+                continue
+            if isinstance(result, Container):
+                result = results[i] = result.format(data.format)
+            if data.meta.save:
+                try:
+                    result.meta.saved_as = save_query.query_finder.save(data)
+                except Exception, e:
+                    Log.warning("Unexpected save problem", cause=e)
+        except Exception as e:
+            results[i] = Except.wrap(e).__data__()
+            failed.add(i)
+
+    # EVERY QUERY IN THE BATCH WAITED FOR THE WHOLE BATCH
+    seconds = time() - start
+    for i, data in enumerate(queries):
+        metrics.record("error" if i in failed else "batch", _index_name(data), total=seconds)
+    return results
+
+
+def _estimate_cost(query):
+    """
+    A PROBLEM WITH THE ESTIMATE MUST NOT FAIL THE QUERY
+    """
+    try:
+        return estimate_cost(query).cost
+    except Exception as e:
+        Log.warning("Could not estimate cost of query", cause=e)
+        return DEFAULT_COST
+
+
+def _cluster_key(frum):
+    return frum._es.cluster.path
+
+
+def _query_type(frum, query):
+    if is_deepop(frum._es, query):
+        return "deep"
+    elif is_aggsop(frum._es, query):
+        return "aggs"
+    else:
+        return "set"
+
+
+def _index_name(data):
+    frum = data["from"]
+    if isinstance(frum, text_type):
+        return split_field(frum)[0]
+    return "other"
+
+
+def _coalesce_key(data):
+    """
+    IDENTICAL QUERIES HAVE THE SAME KEY, NO MATTER THE ORDER OF THEIR PROPERTIES, OR THEIR meta.timeout
+    """
+    query = data.copy()
+    if query.meta.timeout != None:
+        meta = query.meta.copy()
+        meta.timeout = None
+        query.meta = meta if meta.keys() else None
+    return convert.value2json(query, sort_keys=True)
+
+
+def _timeout(data):
+    """
+    THE CLIENT MAY ASK FOR LESS TIME, NOT MORE
+    """
+    if data.meta.timeout:
+        return min(float(data.meta.timeout), MAX_TIMEOUT)
+    return MAX_TIMEOUT
+
+
+class _watch_client(object):
+    """
+    CANCEL THE deadline IF THE CLIENT DISCONNECTS WHILE WE WAIT ON ES
+    ONLY gunicorn SHOWS US ITS SOCKET; OTHERWISE THIS DOES NOTHING
+    """
+
+    def __init__(self, deadline):
+        self.deadline = deadline
+        self.socket = flask.request.environ.get("gunicorn.socket")
+        self.thread = None
+
+    def __enter__(self):
+        if self.socket:
+            self.thread = Thread.run("watch client", self._watch)
+        return self
+
+    def __exit__(self, type, value, traceback):
+        if self.thread:
+            self.thread.stop()
+
+    def _watch(self, please_stop):
+        while not please_stop:
+            try:
+                readable, _, _ = select([self.socket], [], [], 0)
+                if readable and not self.socket.recv(1, socket.MSG_PEEK):
+                    Log.note("Client disconnected, cancel query {{id}}", id=self.deadline.opaque_id)
+                    self.deadline.cancel()
+                    return
+            except Exception as e:
+                Log.warning("Can not watch client", cause=e)
+                return
+            (Till(seconds=1) | please_stop).wait()
@@ -0,0 +1,193 @@
+# encoding: utf-8
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Author: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import os
+from bisect import bisect_left
+from time import time
+
+from flask import Response
+
+from active_data import cors_wrapper
+from mo_files import File
+from mo_json import json2value, value2json
+from mo_kwargs import override
+from mo_logs import Log
+from mo_threads import Lock, Thread, Till
+
+BUCKETS = [0.001 * 2 ** (i / 2) for i in range(42)]  # UPPER BOUNDS, IN SECONDS: 1ms TO 30min, TWO PER DOUBLING
+
+store = None  # THE Metrics FOR THIS PROCESS, SET BY app.setup()
+
+
+def record(type, index, **stages):
+    """
+    :param type: QUERY TYPE (set, aggs, deep, ...)
+    :param index: THE INDEX QUERIED
+    :param stages: MAP FROM STAGE NAME TO SECONDS
+    """
+    if store is None:
+        return
+    store.add(type, index, stages)
+
+
+@cors_wrapper
+def get_metrics(path=None):
+    """
+    PROMETHEUS TEXT FORMAT, FOR ALL WORKERS
+    """
+    content = store.prometheus() if store else ""
+    return Response(
+        content.encode("utf8"),
+        status=200,
+        headers={"Content-Type": "text/plain; version=0.0.4"}
+    )
+
+
+class Histogram(object):
+    """
+    COUNTS OF DURATIONS, IN FIXED LOGARITHMIC BUCKETS, SO HISTOGRAMS FROM MANY WORKERS CAN BE ADDED
+    """
+    __slots__ = ["counts", "sum"]
+
+    def __init__(self, counts=None, sum=0):
+        self.counts = counts or [0] * (len(BUCKETS) + 1)  # LAST BUCKET IS +Inf
+        self.sum = sum
+
+    def add(self, seconds):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+
+    def merge(self, other):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.sum += other.sum
+
+
+class Metrics(object):
+    """
+    PER-STAGE LATENCY HISTOGRAMS, TAGGED BY QUERY TYPE AND INDEX
+
+    EACH WORKER WRITES ITS HISTOGRAMS TO {directory}/worker_{pid}_{start}.json EVERY flush SECONDS; THE
+    WORKER ANSWERING /metrics ADDS ALL THE FILES TOGETHER. THE COUNTS ARE CUMULATIVE, SO THE
+    FILE OF A DEAD WORKER IS KEPT: ITS COUNTS MUST NOT DISAPPEAR FROM THE TOTAL
+    """
+
+    @override
+    def __init__(self, directory=None, flush=10, kwargs=None):
+        self.locker = Lock("metrics")
+        self.histograms = {}  # MAP FROM (stage, type, index) TO Histogram
+        self.directory = File(directory) if directory else None
+        self.flush_period = flush
+        if self.directory:
+            if not self.directory.exists:
+                self.directory.create()
+            Thread.run("flush metrics", self._flusher)
+
+    def add(self, type, index, stages):
+        with self.locker:
+            for stage, seconds in stages.items():
+                key = stage, type, index
+                h = self.histograms.get(key)
+                if h is None:
+                    h = self.histograms[key] = Histogram()
+                h.add(seconds)
+
+    def _snapshot(self):
+        with self.locker:
+            return [
+                {"stage": s, "type": t, "index": i, "counts": list(h.counts), "sum": h.sum}
+                for (s, t, i), h in self.histograms.items()
+            ]
+
+    def flush(self):
+        """
+        WRITE THIS WORKER'S HISTOGRAMS, REPLACING THE FILE ATOMICALLY SO READERS NEVER SEE HALF
+        """
+        filename = File.new_instance(self.directory, _worker_name() + ".json").abspath
+        temp = filename + ".tmp"
+        File(temp).write(value2json(self._snapshot()))
+        os.rename(temp, filename)
+
+    def _flusher(self, please_stop):
+        while not please_stop:
+            (Till(seconds=self.flush_period) | please_stop).wait()
+            try:
+                self.flush()
+            except Exception as e:
+                Log.warning("Problem writing metrics", cause=e)
+
+    def collect(self):
+        """
+        :return: MAP FROM (stage, type, index) TO Histogram, FOR ALL WORKERS
+        """
+        if not self.directory:
+            snapshots = [self._snapshot()]
+        else:
+            self.flush()
+            snapshots = []
+            for f in self.directory.children:
+                if f.extension != "json":
+                    continue
+                try:
+                    snapshots.append(json2value(f.read()))
+                except Exception as e:
+                    Log.warning("Problem reading metrics {{file}}", file=f.abspath, cause=e)
+
+        output = {}
+        for snapshot in snapshots:
+            for h in snapshot:
+                key = h["stage"], h["type"], h["index"]
+                total = output.get(key)
+                if total is None:
+                    total = output[key] = Histogram()
+                total.merge(Histogram(list(h["counts"]), h["sum"]))
+        return output
+
+    def prometheus(self):
+        """
+        :return: THE HISTOGRAMS IN PROMETHEUS TEXT FORMAT
+        """
+        lines = [
+            "# HELP activedata_query_stage_seconds Time spent in each stage of a query",
+            "# TYPE activedata_query_stage_seconds histogram"
+        ]
+        for (stage, type, index), h in sorted(self.collect().items()):
+            labels = 'stage="' + _escape(stage) + '",type="' + _escape(type) + '",index="' + _escape(index) + '"'
+            running = 0
+            for bound, count in zip(BUCKETS, h.counts):
+                running += count
+                lines.append("activedata_query_stage_seconds_bucket{" + labels + ',le="' + repr(bound) + '"} ' + str(running))
+            running += h.counts[-1]
+            lines.append("activedata_query_stage_seconds_bucket{" + labels + ',le="+Inf"} ' + str(running))
+            lines.append("activedata_query_stage_seconds_sum{" + labels + "} " + repr(h.sum))
+            lines.append("activedata_query_stage_seconds_count{" + labels + "} " + str(running))
+        return "\n".join(lines) + "\n"
+
+
+_worker = (None, None)  # (pid, name) OF THIS PROCESS
+
+
+def _worker_name():
+    """
+    THE PID, AND WHEN WE FIRST SAW IT, SO A REUSED PID DOES NOT OVERWRITE A DEAD WORKER'S COUNTS
+    """
+    global _worker
+    pid, name = _worker
+    if pid != os.getpid():
+        # FIRST CALL, OR WE ARE A FORKED CHILD
+        pid = os.getpid()
+        name = "worker_" + str(pid) + "_" + str(int(time() * 1000))
+        _worker = pid, name
+    return name
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
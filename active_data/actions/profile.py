@@ -0,0 +1,109 @@
+# encoding: utf-8
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Author: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import os
+from time import time
+
+from flask import Response
+
+from active_data import cors_wrapper
+from active_data.actions.metrics import _worker_name
+from mo_files import File
+from mo_kwargs import override
+from mo_logs import Log
+from mo_logs.profiles import SamplingProfiler, write_collapsed
+from mo_threads import Thread, Till
+
+sampler = None  # THE Sampler FOR THIS PROCESS, SET BY app.setup()
+_idle = SamplingProfiler()  # NEVER STARTED, SO NEVER SAMPLES
+
+
+def endpoint(name):
+    """
+    SAMPLE THE CURRENT THREAD (SOMETIMES) WHILE IT SERVES THE NAMED ENDPOINT
+    """
+    return (sampler.profiler if sampler else _idle).endpoint(name)
+
+
+@cors_wrapper
+def get_profile(path=None):
+    """
+    COLLAPSED STACKS, FOR ALL WORKERS, READY FOR flamegraph.pl
+    """
+    content = write_collapsed(sampler.collect()) if sampler else ""
+    return Response(
+        content.encode("utf8"),
+        status=200,
+        headers={"Content-Type": "text/plain"}
+    )
+
+
+class Sampler(object):
+    """
+    A SamplingProfiler FOR EACH WORKER; THE WORKERS SHARE THEIR STACKS THROUGH FILES IN directory,
+    NAMED LIKE THE metrics FILES, SO A REUSED PID DOES NOT OVERWRITE A DEAD WORKER'S SAMPLES
+
+    UNLIKE THE metrics, A PROFILE IS ABOUT RECENT BEHAVIOUR: A WORKER'S FILE IS REWRITTEN EVERY
+    flush SECONDS, SO A FILE NOT WRITTEN FOR keep SECONDS BELONGS TO A DEAD WORKER, AND IS REMOVED
+    """
+
+    @override
+    def __init__(self, interval=0.01, rate=0.01, directory=None, flush=60, keep=3600, kwargs=None):
+        self.profiler = SamplingProfiler(interval=interval, rate=rate)
+        self.directory = File(directory) if directory else None
+        self.flush_period = flush
+        self.keep = max(keep, 2 * flush)  # NEVER EXPIRE A LIVE WORKER
+        self.profiler.start()
+        if self.directory:
+            if not self.directory.exists:
+                self.directory.create()
+            Thread.run("flush profile", self._flusher)
+
+    def flush(self):
+        filename = File.new_instance(self.directory, _worker_name() + ".txt").abspath
+        temp = filename + ".tmp"
+        File(temp).write(write_collapsed(self.profiler.collapsed()))
+        os.rename(temp, filename)
+
+    def _flusher(self, please_stop):
+        while not please_stop:
+            (Till(seconds=self.flush_period) | please_stop).wait()
+            try:
+                self.flush()
+            except Exception as e:
+                Log.warning("Problem writing profile", cause=e)
+
+    def collect(self):
+        """
+        :return: MAP FROM COLLAPSED STACK TO NUMBER OF SAMPLES, FOR ALL WORKERS
+        """
+        if not self.directory:
+            return self.profiler.collapsed()
+
+        self.flush()
+        old = time() - self.keep
+        output = {}
+        for f in self.directory.children:
+            if f.extension != "txt":
+                continue
+            try:
+                if os.path.getmtime(f.abspath) < old:
+                    # A DEAD WORKER
+                    os.remove(f.abspath)
+                    continue
+            except OSError:
+                continue  # ALREADY GONE
+            for line in f.read_lines():
+                stack, _, count = line.rpartition(" ")
+                if stack:
+                    output[stack] = output.get(stack, 0) + int(count)
+        return output
@@ -11,6 +11,7 @@ from __future__ import division
 from __future__ import unicode_literals
 
 import hashlib
+from collections import OrderedDict
 
 import jx_elasticsearch
 from active_data import cors_wrapper
@@ -18,10 +19,9 @@ from flask import Response
 from mo_dots import wrap
 from mo_kwargs import override
 from mo_logs import Log
-from mo_threads import Thread
+from mo_threads import Lock, Thread, Till
 from pyLibrary import convert
 
-from jx_python.containers.cube import Cube
 from mo_json import json2value
 from mo_logs.exceptions import Except
 from mo_times.dates import Date
@@ -63,8 +63,14 @@ def find_query(hash):
 
 
 class SaveQueries(object):
+    """
+    SAVED QUERIES NEVER CHANGE, SO THE MOST RECENTLY USED ARE KEPT IN MEMORY, AND
+    /find/<hash> IS USUALLY ANSWERED WITHOUT ES. THE last_used OF THE QUERIES FOUND
+    ARE SET ONCE EVERY last_used_period SECONDS, IN ONE UPDATE
+    """
+
     @override
-    def __init__(self, host, index, type="query", max_size=10, batch_size=10, kwargs=None):
+    def __init__(self, host, index, type="query", max_size=10, batch_size=10, cache_size=10000, last_used_period=60, kwargs=None):
         """
         settings ARE FOR THE ELASTICSEARCH INDEX
         """
@@ -88,8 +94,25 @@ class SaveQueries(object):
         es.flush()
         self.queue = es.threaded_queue(max_size=max_size, batch_size=batch_size, period=1)
         self.es = jx_elasticsearch.new_instance(es.settings)
+        self._setup_cache(cache_size, last_used_period)
+
+    def _setup_cache(self, cache_size, last_used_period):
+        self.locker = Lock("saved queries")
+        self.cache = OrderedDict()  # MAP FROM hash TO query JSON, LEAST RECENTLY USED FIRST
+        self.cache_size = cache_size
+        self.used = set()  # hashES FOUND SINCE THE LAST UPDATE OF last_used
+        self.last_used_period = last_used_period
+        self.updater = Thread.run("update last_used", self._updater)
 
     def find(self, hash):
+        with self.locker:
+            query = self.cache.pop(hash, None)
+            if query is not None:
+                self.cache[hash] = query
+                self.used.add(hash)
+                return query
+
+        # hash MAY BE A PREFIX
         result = self.es.query({
             "select": ["hash", "query"],
             "from": "saved_queries",
@@ -105,12 +128,9 @@ class SaveQueries(object):
         except Exception:
             return None
 
-        self.es.update({
-            "update": {"type": "elasticsearch", "settings": self.es.settings},
-            "set": {"last_used": Date.now()},
-            "where": {"eq": {"hash": hash}}
-        })
-
+        with self.locker:
+            self._cache(hash, query)
+            self.used.add(hash)
         return query
 
     def save(self, query):
@@ -118,44 +138,104 @@ class SaveQueries(object):
         json = convert.value2json(query)
         hash = convert.unicode2utf8(json)
 
-        # TRY MANY HASHES AT ONCE
+        # THE FIRST HASH IS ALMOST ALWAYS AVAILABLE, OR ALREADY HOLDS THIS QUERY
+        first = _short_hash(hashlib.sha1(hash).digest())
+        with self.locker:
+            if self.cache.get(first) == json:
+                return first
+        existing = self.es.query({
+            "select": ["hash", "query"],
+            "from": "saved_queries",
+            "where": {"eq": {"hash": first}},
+            "format": "list",
+            "meta": {"timeout": "2second"}
+        })
+        if not existing.data:
+            return self._add(first, json)
+        elif wrap(existing.data[0]).query == json:
+            with self.locker:
+                self._cache(first, json)
+            return first
+
+        # COLLISION: TRY MANY HASHES AT ONCE
         hashes = [None] * HASH_BLOCK_SIZE
         for i in range(HASH_BLOCK_SIZE):
             hash = hashlib.sha1(hash).digest()
             hashes[i] = hash
 
-        short_hashes = [convert.bytes2base64(h[0:6]).replace("/", "_") for h in hashes]
+        short_hashes = [_short_hash(h) for h in hashes]
         available = {h: True for h in short_hashes}
 
         existing = self.es.query({
+            "select": ["hash", "query"],
             "from": "saved_queries",
             "where": {"terms": {"hash": short_hashes}},
+            "format": "list",
             "meta": {"timeout": "2second"}
         })
 
-        for e in Cube(select=existing.select, edges=existing.edges, data=existing.data).values():
+        for e in wrap(existing.data):
             if e.query == json:
                 return e.hash
             available[e.hash] = False
 
         # THIS WILL THROW AN ERROR IF THERE ARE NONE, HOW UNLUCKY!
         best = [h for h in short_hashes if available[h]][0]
+        return self._add(best, json)
 
+    def _add(self, hash, json):
         self.queue.add({
-            "id": best,
+            "id": hash,
             "value": {
-                "hash": best,
+                "hash": hash,
                 "create_time": Date.now(),
                 "last_used": Date.now(),
                 "query": json
             }
         })
+        with self.locker:
+            # FOUND BY /find EVEN BEFORE ES HAS INDEXED IT
+            self._cache(hash, json)
+
+        Log.note("Saved query as {{hash}}", hash=hash)
+        return hash
 
-        Log.note("Saved query as {{hash}}", hash=best)
+    def _cache(self, hash, query):
+        # EXPECTING self.locker
+        self.cache.pop(hash, None)
+        self.cache[hash] = query
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def update_last_used(self):
+        """
+        SET last_used OF ALL THE QUERIES FOUND SINCE LAST TIME, IN ONE UPDATE
+        """
+        with self.locker:
+            used, self.used = self.used, set()
+        if not used:
+            return
+        self.es.update({
+            "update": {"type": "elasticsearch", "settings": self.es.settings},
+            "set": {"last_used": Date.now()},
+            "where": {"in": {"hash": list(used)}}
+        })
 
-        return best
+    def _updater(self, please_stop):
+        while not please_stop:
+            (Till(seconds=self.last_used_period) | please_stop).wait()
+            try:
+                self.update_last_used()
+            except Exception as e:
+                Log.warning("Problem updating last_used of saved queries", cause=e)
 
     def stop(self):
+        try:
+            self.updater.stop()  # ONE LAST UPDATE OF last_used
+            self.updater.join()
+        except Exception, e:
+            pass
+
         try:
             self.queue.add(Thread.STOP)  # BE PATIENT, LET REST OF MESSAGE BE SENT
         except Exception, e:
@@ -166,6 +246,11 @@ class SaveQueries(object):
         except Exception, f:
             pass
 
+
+def _short_hash(hash):
+    return convert.bytes2base64(hash[0:6]).replace("/", "_")
+
+
 SCHEMA = {
     "settings": {
         "index.number_of_shards": 3,
@@ -105,7 +105,27 @@ def sql_query(path):
         return send_error(query_timer, request_body, e)
 
 
-KNOWN_SQL_AGGREGATES = {"sum", "count", "avg"}
+# MAP FROM SQL FUNCTION TO jx AGGREGATE
+KNOWN_SQL_AGGREGATES = {
+    "avg": "average",
+    "average": "average",
+    "mean": "average",
+    "cardinality": "cardinality",
+    "count": "count",
+    "max": "maximum",
+    "maximum": "maximum",
+    "median": "median",
+    "min": "minimum",
+    "minimum": "minimum",
+    "percentile": "percentile",
+    "stats": "stats",
+    "std": "stddev",
+    "stddev": "stddev",
+    "sum": "sum",
+    "union": "union",
+    "var": "variance",
+    "variance": "variance"
+}
 
 
 def parse_sql(sql):
@@ -124,10 +144,33 @@ def parse_sql(sql):
                 pass
 
         if isinstance(val, Mapping):
-            for a in KNOWN_SQL_AGGREGATES:
-                if val[a]:
-                    s.aggregate = a
-                    s.value = val[a]
+            for a, params in val.items():
+                if a in KNOWN_SQL_AGGREGATES:
+                    _set_aggregate(s, KNOWN_SQL_AGGREGATES[a], params)
     query.select = [s for s in listwrap(query.select) if s.value != None]
     query.format = "table"
     return query
+
+
+def _set_aggregate(select, aggregate, params):
+    """
+    SET THE jx aggregate (AND ITS value) OF select, FROM THE SQL FUNCTION PARAMETERS
+    """
+    if aggregate == "percentile":
+        # percentile(value, fraction)
+        if not isinstance(params, list) or len(params) != 2:
+            Log.error("Expecting percentile(value, fraction)")
+        select.value, select.percentile = params
+    elif isinstance(params, list):
+        Log.error("Expecting one parameter for {{aggregate}}", aggregate=aggregate)
+    elif isinstance(params, Mapping) and set(params.keys()) == {"distinct"}:
+        # count(distinct value)
+        if aggregate != "count":
+            Log.error("Expecting DISTINCT only in count()")
+        select.value = params["distinct"]
+        aggregate = "cardinality"
+    elif params == "*" and aggregate == "count":
+        select.value = "."  # count(*) COUNTS THE DOCUMENTS
+    else:
+        select.value = params
+    select.aggregate = aggregate
@@ -0,0 +1,244 @@
+# encoding: utf-8
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Author: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+from time import time
+
+from mo_kwargs import override
+from mo_logs import Log, Except
+from mo_threads import Lock, Signal, Till
+
+QUERY_TOO_BUSY = "Query is too expensive to run now"
+
+scheduler = None  # THE Admission FOR THIS PROCESS, SET BY app.setup()
+
+
+class Admission(object):
+    """
+    LIMIT THE QUERIES RUNNING AGAINST EACH CLUSTER BY THEIR ESTIMATED COST
+
+    * THE running QUERIES ON A CLUSTER MAY NOT EXCEED max_cost, IN TOTAL
+    * NO MORE THAN max_expensive QUERIES OF expensive COST, OR MORE, RUN AT ONCE
+    * WAITING QUERIES ARE ADMITTED CHEAPEST FIRST, SO INTERACTIVE QUERIES GO AROUND THE BIG ONES
+    * A QUERY IS REJECTED (HTTP 429) IF IT COSTS MORE THAN max_cost, IF max_queue
+      QUERIES ARE ALREADY WAITING, OR IF IT HAS WAITED max_wait SECONDS
+
+    THE request(), release() AND expire() METHODS ARE GIVEN THE TIME, AND DO NOT BLOCK,
+    SO THE SCHEDULE CAN BE SIMULATED; enter() IS THE BLOCKING VERSION USED BY THE SERVICE
+    """
+
+    @override
+    def __init__(
+        self,
+        max_cost=10 * 1000 * 1000 * 1000,  # TOTAL COST ALLOWED TO RUN ON ONE CLUSTER
+        expensive=100 * 1000 * 1000,  # QUERIES COSTING THIS MUCH ARE "EXPENSIVE"
+        max_expensive=1,  # NUMBER OF EXPENSIVE QUERIES ALLOWED TO RUN ON ONE CLUSTER
+        max_queue=20,  # NUMBER OF QUERIES ALLOWED TO WAIT FOR ONE CLUSTER
+        max_wait=30,  # SECONDS A QUERY MAY WAIT BEFORE IT IS REJECTED
+        kwargs=None
+    ):
+        self.settings = kwargs
+        self.locker = Lock("admission")
+        self.lanes = {}  # MAP FROM CLUSTER TO Lane
+        self.next_seq = 0
+
+    def request(self, cluster, cost, now):
+        """
+        :param cluster: KEY FOR THE CLUSTER THE QUERY WILL RUN ON
+        :param cost: ESTIMATED COST OF THE QUERY
+        :param now: CURRENT TIME (SECONDS)
+        :return: Ticket, WHICH IS EITHER "running" OR "waiting"; RAISE IF REJECTED
+        """
+        if cost > self.settings.max_cost:
+            Log.error(
+                QUERY_TOO_BUSY + ": Estimated cost of {{cost|comma}} is more than the {{max|comma}} allowed",
+                cost=int(cost),
+                max=self.settings.max_cost
+            )
+        self.expire(now)
+        lane = self.lanes.get(cluster)
+        if lane is None:
+            lane = self.lanes[cluster] = Lane()
+        if len(lane.waiting) >= self.settings.max_queue:
+            Log.error(
+                QUERY_TOO_BUSY + ": {{num}} queries are already waiting; estimated cost is {{cost|comma}}",
+                num=len(lane.waiting),
+                cost=int(cost)
+            )
+
+        ticket = Ticket(cluster, cost, cost >= self.settings.expensive, now, self.next_seq)
+        self.next_seq += 1
+        lane.waiting.append(ticket)
+        lane.waiting.sort(key=_priority)
+        self._schedule(lane)
+        return ticket
+
+    def release(self, ticket, now):
+        """
+        THE QUERY IS DONE (OR WILL NOT BE RUN)
+        :return: LIST OF TICKETS THAT ARE NOW ADMITTED
+        """
+        lane = self.lanes[ticket.cluster]
+        if ticket.state == "running":
+            lane.running_cost -= ticket.cost
+            if ticket.expensive:
+                lane.running_expensive -= 1
+        elif ticket.state == "waiting":
+            lane.waiting.remove(ticket)
+        ticket.state = "done"
+        ticket.end = now
+        return self._schedule(lane)
+
+    def expire(self, now):
+        """
+        REJECT THE TICKETS THAT HAVE WAITED TOO LONG
+        :return: LIST OF REJECTED TICKETS
+        """
+        output = []
+        for lane in self.lanes.values():
+            for t in list(lane.waiting):
+                if now - t.arrival >= self.settings.max_wait:
+                    lane.waiting.remove(t)
+                    t.state = "rejected"
+                    t.end = now
+                    t.signal.go()
+                    output.append(t)
+        return output
+
+    def _schedule(self, lane):
+        admitted = []
+        for t in list(lane.waiting):
+            if lane.running_cost + t.cost > self.settings.max_cost:
+                continue
+            if t.expensive and lane.running_expensive >= self.settings.max_expensive:
+                continue
+            lane.waiting.remove(t)
+            lane.running_cost += t.cost
+            if t.expensive:
+                lane.running_expensive += 1
+            t.state = "running"
+            t.signal.go()
+            admitted.append(t)
+        return admitted
+
+    def enter(self, cluster, cost):
+        """
+        BLOCK UNTIL THE QUERY MAY RUN, OR RAISE IF IT IS REJECTED
+
+            with scheduler.enter(cluster, estimate.cost):
+                result = jx.run(query, frum=frum)
+        """
+        with self.locker:
+            ticket = self.request(cluster, cost, time())
+        if ticket.state == "waiting":
+            (ticket.signal | Till(seconds=self.settings.max_wait)).wait()
+            with self.locker:
+                if ticket.state != "running":
+                    self.release(ticket, time())
+                    Log.error(
+                        QUERY_TOO_BUSY + ": Waited {{wait}} seconds; estimated cost is {{cost|comma}}",
+                        wait=self.settings.max_wait,
+                        cost=int(cost)
+                    )
+        ticket.scheduler = self
+        return ticket
+
+    def enter_batch(self, requests):
+        """
+        ADMIT MANY QUERIES, EACH ON ITS OWN, WITHOUT BLOCKING
+        :param requests: LIST OF (cluster, cost) PAIRS
+        :return: LIST OF Ticket ("running" OR "waiting"), OR Except (REJECTED), IN THE SAME ORDER
+        """
+        output = []
+        with self.locker:
+            now = time()
+            for cluster, cost in requests:
+                try:
+                    ticket = self.request(cluster, cost, now)
+                    ticket.scheduler = self
+                    output.append(ticket)
+                except Exception as e:
+                    output.append(Except.wrap(e))
+        return output
+
+    def wait_any(self, tickets):
+        """
+        BLOCK UNTIL ONE OF THE waiting TICKETS IS ADMITTED, OR THE OLDEST HAS WAITED max_wait
+        :return: LIST OF TICKETS THAT WILL NOT RUN (WAITED TOO LONG); THEY ARE RELEASED
+        """
+        waiting = [t for t in tickets if t.state == "waiting"]
+        if waiting:
+            timeout = Till(seconds=max(0, min(t.arrival for t in waiting) + self.settings.max_wait - time()))
+            signal = timeout
+            for t in waiting:
+                signal = signal | t.signal
+            signal.wait()
+
+        output = []
+        with self.locker:
+            now = time()
+            for t in tickets:
+                if t.state == "rejected" or (t.state == "waiting" and now - t.arrival >= self.settings.max_wait):
+                    self.release(t, now)
+                    output.append(t)
+        return output
+
+
+def waited_too_long(ticket, max_wait):
+    """
+    :return: THE ERROR FOR A TICKET THAT WAITED TOO LONG
+    """
+    return Except(
+        template=QUERY_TOO_BUSY + ": Waited {{wait}} seconds; estimated cost is {{cost|comma}}",
+        params={"wait": max_wait, "cost": int(ticket.cost)}
+    )
+
+
+class Lane(object):
+    """
+    THE STATE OF ONE CLUSTER
+    """
+    __slots__ = ["running_cost", "running_expensive", "waiting"]
+
+    def __init__(self):
+        self.running_cost = 0
+        self.running_expensive = 0
+        self.waiting = []  # TICKETS, CHEAPEST FIRST
+
+
+class Ticket(object):
+    __slots__ = ["cluster", "cost", "expensive", "arrival", "seq", "end", "state", "signal", "scheduler"]
+
+    def __init__(self, cluster, cost, expensive, arrival, seq):
+        self.cluster = cluster
+        self.cost = cost
+        self.expensive = expensive
+        self.arrival = arrival
+        self.seq = seq
+        self.end = None
+        self.state = "waiting"
+        self.signal = Signal("admit query")
+        self.scheduler = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.release()
+
+    def release(self):
+        scheduler = self.scheduler
+        with scheduler.locker:
+            scheduler.release(self, time())
+
+
+def _priority(ticket):
+    return ticket.cost, ticket.seq
@@ -23,10 +23,10 @@ from werkzeug.contrib.fixers import HeaderRewriterFix
 from werkzeug.wrappers import Response
 
 import active_data
-from active_data import record_request, cors_wrapper
-from active_data.actions import save_query
+from active_data import record_request, cors_wrapper, admission, coalesce
+from active_data.actions import save_query, metrics, profile
 from active_data.actions.json import get_raw_json
-from active_data.actions.jx import jx_query
+from active_data.actions.jx import jx_query, jx_batch
 from active_data.actions.save_query import SaveQueries, find_query
 from active_data.actions.sql import sql_query
 from active_data.actions.static import download
@@ -67,10 +67,13 @@ flask_app.add_url_rule('/tools/<path:filename>', None, download)
 flask_app.add_url_rule('/find/<path:hash>', None, find_query)
 flask_app.add_url_rule('/query', None, jx_query, defaults={'path': ''}, methods=['GET', 'POST'])
 flask_app.add_url_rule('/query/', None, jx_query, defaults={'path': ''}, methods=['GET', 'POST'])
+flask_app.add_url_rule('/query/batch', None, jx_batch, defaults={'path': ''}, methods=['GET', 'POST'])
 flask_app.add_url_rule('/sql', None, sql_query, defaults={'path': ''}, methods=['GET', 'POST'])
 flask_app.add_url_rule('/sql/', None, sql_query, defaults={'path': ''}, methods=['GET', 'POST'])
 flask_app.add_url_rule('/query/<path:path>', None, jx_query, defaults={'path': ''}, methods=['GET', 'POST'])
 flask_app.add_url_rule('/json/<path:path>', None, get_raw_json, methods=['GET'])
+flask_app.add_url_rule('/metrics', None, metrics.get_metrics, methods=['GET'])
+flask_app.add_url_rule('/profile', None, profile.get_profile, methods=['GET'])
 
 
 @flask_app.route('/', defaults={'path': ''}, methods=['GET', 'POST'])
@@ -123,6 +126,19 @@ def setup():
         "settings": config.elasticsearch.copy()
     }
 
+    # LIMIT THE EXPENSIVE QUERIES RUNNING AT ONCE
+    admission.scheduler = admission.Admission(kwargs=config.admission)
+
+    # IDENTICAL QUERIES RUNNING AT THE SAME TIME ARE RUN ONCE; ACROSS WORKERS IF THERE IS A config.coalesce.directory
+    coalesce.coalescer = coalesce.Coalescer(kwargs=config.coalesce)
+
+    # PER-STAGE LATENCY, SHARED WITH THE OTHER WORKERS THROUGH config.metrics.directory
+    metrics.store = metrics.Metrics(kwargs=config.metrics)
+
+    # SAMPLE A FEW REQUESTS, ALWAYS; STACKS ARE SHARED WITH THE OTHER WORKERS THROUGH config.profile.directory
+    if config.profile:
+        profile.sampler = profile.Sampler(kwargs=config.profile)
+
     # TRIGGER FIRST INSTANCE
     if config.saved_queries:
         setattr(save_query, "query_finder", SaveQueries(config.saved_queries))
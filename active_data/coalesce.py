@@ -0,0 +1,257 @@
+# encoding: utf-8
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Author: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import errno
+import hashlib
+import os
+from time import time
+
+from mo_files import File
+from mo_kwargs import override
+from mo_logs import Log
+from mo_threads import Lock, Signal, Thread, Till
+from pyLibrary.env.elasticsearch import DEADLINE_EXCEEDED
+
+POLL = 0.05  # SECONDS BETWEEN CHECKS ON ANOTHER WORKER'S running MARKER
+EMPTY_MARKER = 5  # SECONDS AN EMPTY running MARKER IS TRUSTED; AFTER THAT, ITS WORKER DIED BEFORE WRITING ITS PID
+
+coalescer = None  # THE Coalescer FOR THIS PROCESS, SET BY app.setup()
+
+
+class Coalescer(object):
+    """
+    SINGLE FLIGHT: OF MANY IDENTICAL REQUESTS RUNNING AT THE SAME TIME, ONLY ONE (THE LEADER)
+    DOES THE WORK; THE OTHERS (THE FOLLOWERS) WAIT, AND GET THE SAME BYTES
+
+    * IN ONE WORKER, THE FOLLOWERS WAIT ON THE LEADER'S Signal
+    * WITH A directory, THE WORKERS ALSO COORDINATE: THE WORKER THAT CREATES
+      {directory}/{key}.running RUNS THE REQUEST. ANOTHER WORKER WITH THE SAME REQUEST CREATES
+      {directory}/{key}.wanted, AND WAITS FOR THE running MARKER TO GO. ONLY WHEN wanted EXISTS
+      DOES THE RUNNING WORKER WRITE ITS RESPONSE TO {directory}/{key}.response, SO A QUERY NO
+      OTHER WORKER IS WAITING FOR COSTS NO MORE THAN CREATING AND REMOVING THE MARKER.
+      NO FILE LOCK IS HELD WHILE THE REQUEST RUNS. THIS IS BEST EFFORT: AT WORST, TWO WORKERS
+      BOTH RUN THE REQUEST
+    * IF THE LEADER FAILS, THE FOLLOWERS DO NOT SHARE ITS ERROR; ONE OF THEM BECOMES THE NEXT
+      LEADER, BECAUSE THE LEADER MAY HAVE FAILED FOR ITS OWN REASONS (ITS CLIENT DISCONNECTED,
+      IT ASKED FOR A SHORT meta.timeout)
+    """
+
+    @override
+    def __init__(self, directory=None, keep=60, kwargs=None):
+        self.locker = Lock("coalesce")
+        self.flights = {}  # MAP FROM KEY TO THE Flight OF THE LEADER
+        self.leaders = 0
+        self.followers = 0
+        self.directory = File(directory) if directory else None
+        self.keep = keep  # SECONDS TO KEEP THE FILES OF A FINISHED REQUEST
+        self.cleaner = None
+        if self.directory:
+            if not self.directory.exists:
+                self.directory.create()
+            self.cleaner = Thread.run("clean coalesce", self._cleaner)
+
+    def run(self, key, function, timeout):
+        """
+        :param key: TEXT; IDENTICAL REQUESTS HAVE THE SAME key
+        :param function: RETURNS (content_type, content) WHERE content IS BYTES; ONLY THE LEADER CALLS IT
+        :param timeout: SECONDS A FOLLOWER WILL WAIT FOR THE LEADER
+        :return: ((content_type, content), coalesced) WHERE coalesced IS True FOR A FOLLOWER
+        """
+        key = hashlib.sha1(key.encode("utf8")).hexdigest()
+        end = time() + timeout
+        while True:
+            with self.locker:
+                flight = self.flights.get(key)
+                if flight is None:
+                    flight = self.flights[key] = Flight()
+                    self.leaders += 1
+                    break
+            (flight.done | Till(till=end)).wait()
+            if not flight.done:
+                Log.error(DEADLINE_EXCEEDED + ": Waited {{timeout}} seconds for an identical query", timeout=timeout)
+            if flight.response is not None:
+                with self.locker:
+                    self.followers += 1
+                return flight.response, True
+            # THE LEADER FAILED; TRY TO LEAD
+
+        try:
+            if self.directory:
+                flight.response, coalesced = self._run_across_workers(key, function, end)
+            else:
+                flight.response, coalesced = function(), False
+            return flight.response, coalesced
+        finally:
+            with self.locker:
+                del self.flights[key]
+            flight.done.go()
+
+    def _run_across_workers(self, key, function, end):
+        running = File.new_instance(self.directory, key + ".running").abspath
+        wanted = File.new_instance(self.directory, key + ".wanted").abspath
+        response_file = File.new_instance(self.directory, key + ".response").abspath
+        start = time()
+        while True:
+            if _create_marker(running):
+                break
+            # ANOTHER WORKER IS RUNNING IT; ASK FOR ITS RESPONSE, AND WAIT FOR IT TO FINISH
+            _touch(wanted)
+            while _is_running(running):
+                if time() > end:
+                    Log.error(DEADLINE_EXCEEDED + ": Waited for an identical query in another worker")
+                Till(seconds=POLL).wait()
+            response = _read_response(response_file, start)
+            if response is not None:
+                with self.locker:
+                    self.followers += 1
+                return response, True
+            # THE OTHER WORKER FAILED, DIED, OR DID NOT SEE US IN TIME; TRY TO LEAD
+            _remove_dead(running)
+
+        lead_start = time()
+        try:
+            response = function()
+            if _modified_since(wanted, lead_start - 1):  # ONE SECOND OF SLACK FOR COARSE mtime
+                # ONLY WRITE THE RESPONSE WHEN ANOTHER WORKER IS WAITING FOR IT
+                _write_response(response_file, response)
+                _remove(wanted)
+            return response, False
+        finally:
+            _remove(running)
+
+    def stop(self):
+        if self.cleaner:
+            self.cleaner.stop()
+            self.cleaner.join()
+
+    def _cleaner(self, please_stop):
+        while not please_stop:
+            (Till(seconds=max(self.keep, 1)) | please_stop).wait()
+            if please_stop:
+                return
+            try:
+                self.clean()
+            except Exception as e:
+                Log.warning("Problem cleaning coalesce directory", cause=e)
+
+    def clean(self):
+        """
+        REMOVE THE FILES OF REQUESTS THAT FINISHED MORE THAN keep SECONDS AGO, AND THE
+        running MARKERS LEFT BY DEAD WORKERS
+        """
+        old = time() - self.keep
+        for f in self.directory.children:
+            filename = f.abspath
+            try:
+                if f.extension == "running":
+                    _remove_dead(filename)
+                elif os.path.getmtime(filename) <= old:
+                    os.remove(filename)
+            except (IOError, OSError):
+                pass  # ALREADY GONE
+
+
+class Flight(object):
+    __slots__ = ["done", "response"]
+
+    def __init__(self):
+        self.done = Signal("coalesced query done")
+        self.response = None
+
+
+def _create_marker(filename):
+    """
+    :return: True IF WE CREATED THE running MARKER (WITH OUR PID IN IT), False IF IT EXISTS
+    """
+    try:
+        fd = os.open(filename, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except OSError as e:
+        if e.errno == errno.EEXIST:
+            return False
+        raise
+    try:
+        os.write(fd, str(os.getpid()).encode("ascii"))
+    finally:
+        os.close(fd)
+    return True
+
+
+def _is_running(filename):
+    """
+    :return: True IF THE running MARKER EXISTS, AND THE WORKER THAT CREATED IT IS ALIVE
+    """
+    try:
+        with open(filename, "rb") as f:
+            pid = f.read()
+    except (IOError, OSError):
+        return False
+    if not pid:
+        # THE MARKER WAS JUST CREATED, AND THE PID IS STILL BEING WRITTEN, OR THE WORKER DIED IN BETWEEN
+        return _modified_since(filename, time() - EMPTY_MARKER)
+    try:
+        os.kill(int(pid), 0)
+        return True
+    except OSError as e:
+        return e.errno == errno.EPERM
+
+
+def _modified_since(filename, since):
+    try:
+        return os.path.getmtime(filename) >= since
+    except OSError:
+        return False
+
+
+def _remove_dead(filename):
+    """
+    REMOVE THE running MARKER OF A DEAD WORKER
+    """
+    if not _is_running(filename):
+        _remove(filename)
+
+
+def _touch(filename):
+    with open(filename, "a"):
+        pass
+    os.utime(filename, None)
+
+
+def _remove(filename):
+    try:
+        os.remove(filename)
+    except OSError:
+        pass
+
+
+def _write_response(filename, response):
+    """
+    WRITE THE TIME, THE CONTENT TYPE, AND THE CONTENT; REPLACE THE FILE ATOMICALLY SO READERS NEVER SEE HALF
+    """
+    content_type, content = response
+    temp = filename + ".tmp"
+    with open(temp, "wb") as f:
+        f.write(repr(time()).encode("ascii") + b"\n" + content_type.encode("utf8") + b"\n" + content)
+    os.rename(temp, filename)
+
+
+def _read_response(filename, since):
+    """
+    :return: (content_type, content) IF IT WAS WRITTEN AFTER since, OTHERWISE None
+    """
+    try:
+        with open(filename, "rb") as f:
+            timestamp, content_type, content = f.read().split(b"\n", 2)
+    except (IOError, OSError):
+        return None
+    if float(timestamp) < since:
+        return None
+    return content_type.decode("utf8"), content
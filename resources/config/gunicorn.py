@@ -10,6 +10,8 @@ timeout = 10*60
 # errorlog = "-"
 
 workers = 5
+worker_class = "gthread"  # THREADS LET CHEAP QUERIES RUN WHILE EXPENSIVE ONES WAIT FOR ADMISSION
+threads = 8  # gthread NEEDS THE futures BACKPORT (SEE requirements.txt)
 accesslog = "/data1/logs/gunicorn_access.log"
 errorlog = "/data1/logs/gunicorn_error.log"
 logfile = "/data1/logs/gunicorn_debug.log"
@@ -0,0 +1,302 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Author: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+"""
+DRIVE THE SERVICE WITH A MIX OF /query, /sql, /json AND /find REQUESTS, FOR EACH gunicorn
+WORKER COUNT IN config.workers, AND REPORT THROUGHPUT, ERRORS AND LATENCY FOR EACH
+
+    python tests/loadgen.py --settings=tests/config/loadgen_settings.json
+
+CLOSED LOOP (config.concurrency): EACH CLIENT SENDS ITS NEXT REQUEST WHEN THE LAST IS ANSWERED
+OPEN LOOP (config.rate): REQUESTS ARRIVE AT RANDOM (POISSON), rate PER SECOND, ANSWERED OR NOT;
+LATENCY IS FROM THE ARRIVAL, SO A BACKLOG IS NOT HIDDEN
+
+WITH config.url THE REQUESTS GO TO A RUNNING SERVICE; OTHERWISE gunicorn IS STARTED FOR EACH
+WORKER COUNT, AGAINST THE ES STUB FROM tests/replay.py
+"""
+from __future__ import division
+from __future__ import unicode_literals
+
+import os
+import subprocess
+import sys
+from collections import Mapping
+from random import Random
+from tempfile import NamedTemporaryFile
+from time import time
+
+from mo_dots import wrap
+from mo_files import File
+from mo_json import json2value, value2json
+from mo_logs import Log, constants, startup
+from mo_threads import Lock, Queue, Thread, Till, THREAD_STOP
+from pyLibrary.env import http
+from tests.replay import StubES, Recording, Synthetic, load_queries, _percentile
+
+ENDPOINTS = ["query", "sql", "json", "find"]
+STARTUP_TIMEOUT = 60  # SECONDS TO WAIT FOR gunicorn TO ANSWER
+MAX_OUTSTANDING = 512  # OPEN LOOP: MOST REQUESTS IN FLIGHT AT ONCE
+
+
+class Mix(object):
+    """
+    RANDOM REQUESTS, IN THE PROPORTIONS OF config.mix
+    """
+
+    def __init__(self, config, seed=0):
+        self.rng = Random(seed)
+        self.requests = {
+            "query": [("POST", "/query", value2json(_named_from(q))) for _, q in load_queries(config.queries)],
+            "sql": [("POST", "/sql", value2json({"sql": s})) for s in config.sql],
+            "json": [("GET", "/json/" + j, None) for j in config.json],
+            "find": [("GET", "/find/" + h, None) for h in config.find]
+        }
+        self.weights = [(e, config.mix[e]) for e in ENDPOINTS if config.mix[e] and self.requests[e]]
+        self.total = sum(w for _, w in self.weights)
+        self.locker = Lock("mix")
+
+    def next(self):
+        """
+        :return: (endpoint, method, path, body)
+        """
+        with self.locker:
+            r = self.rng.random() * self.total
+            for endpoint, weight in self.weights:
+                r -= weight
+                if r < 0:
+                    break
+            method, path, body = self.rng.choice(self.requests[endpoint])
+        return endpoint, method, path, body
+
+
+def _named_from(query):
+    # THE SAMPLE QUERIES NAME THEIR OWN CLUSTER; THE SERVICE HAS ONLY ITS DEFAULT
+    query = json2value(value2json(query))
+    if isinstance(query["from"], Mapping) and query["from"].settings.index:
+        query["from"] = query["from"].settings.index
+    return query
+
+
+def closed_loop(url, mix, concurrency, duration):
+    """
+    :return: LIST OF (endpoint, latency, status), status IS None IF NO RESPONSE
+    """
+    samples = []
+    end = time() + duration
+
+    def client(please_stop):
+        while not please_stop and time() < end:
+            endpoint, method, path, body = mix.next()
+            start = time()
+            status = _send(url, method, path, body)
+            samples.append((endpoint, time() - start, status))
+
+    clients = [Thread.run("client " + str(i), client) for i in range(concurrency)]
+    for c in clients:
+        c.join()
+    return samples
+
+
+def open_loop(url, mix, rate, duration, seed=0):
+    """
+    :return: LIST OF (endpoint, latency, status), status IS None IF NO RESPONSE
+    """
+    rng = Random(seed)
+    samples = []
+    arrivals = Queue("arrivals", max=MAX_OUTSTANDING, silent=True)
+
+    def sender(please_stop):
+        while not please_stop:
+            arrival = arrivals.pop(till=please_stop)
+            if arrival is THREAD_STOP or arrival is None:
+                return
+            scheduled, (endpoint, method, path, body) = arrival
+            status = _send(url, method, path, body)
+            samples.append((endpoint, time() - scheduled, status))
+
+    senders = [Thread.run("sender " + str(i), sender) for i in range(MAX_OUTSTANDING)]
+    start = time()
+    scheduled = start
+    while True:
+        scheduled += rng.expovariate(rate)
+        if scheduled > start + duration:
+            break
+        Till(till=scheduled).wait()
+        arrivals.add((scheduled, mix.next()))
+    arrivals.add(THREAD_STOP)
+    for s in senders:
+        s.join()
+    return samples
+
+
+def _send(url, method, path, body):
+    try:
+        response = http.request(method, url + path, data=body, headers={"Content-Type": "application/json"})
+        response.content
+        return response.status_code
+    except Exception:
+        return None
+
+
+def summarize(samples, duration):
+    """
+    :return: MAP FROM ENDPOINT (AND "all") TO {"requests", "errors", "throughput", "latency"}
+    """
+    output = {}
+    for endpoint in ["all"] + ENDPOINTS:
+        mine = [s for s in samples if endpoint == "all" or s[0] == endpoint]
+        if not mine:
+            continue
+        latencies = [s[1] for s in mine]
+        output[endpoint] = {
+            "requests": len(mine),
+            "errors": len([s for s in mine if s[2] is None or s[2] >= 400]),
+            "throughput": len(mine) / duration,
+            "latency": {
+                "p50": _percentile(latencies, 0.5),
+                "p90": _percentile(latencies, 0.9),
+                "p99": _percentile(latencies, 0.99),
+                "max": max(latencies)
+            }
+        }
+    return wrap(output)
+
+
+def report(results):
+    """
+    :param results: LIST OF {"workers", "threads", "summary"}
+    """
+    lines = ["workers threads endpoint  requests errors   req/sec      p50      p90      p99      max"]
+    for r in results:
+        for endpoint in ["all"] + ENDPOINTS:
+            s = r.summary[endpoint]
+            if not s:
+                continue
+            lines.append("%7s %7s %-8s %9d %6d %9.1f %7.0fms %7.0fms %7.0fms %7.0fms" % (
+                r.workers if r.workers != None else "-",
+                r.threads if r.threads != None else "-",
+                endpoint,
+                s.requests,
+                s.errors,
+                s.throughput,
+                s.latency.p50 * 1000,
+                s.latency.p90 * 1000,
+                s.latency.p99 * 1000,
+                s.latency.max * 1000
+            ))
+    return "\n".join(lines)
+
+
+class Service(object):
+    """
+    gunicorn, SERVING THE APP WITH THE GIVEN NUMBER OF WORKERS, USING THE ES STUB
+    """
+
+    def __init__(self, workers, threads, port, es_port, debug=None):
+        settings = {
+            "constants": {"jx_elasticsearch.meta.ENABLE_META_SCAN": False},
+            "elasticsearch": {"host": "http://localhost", "port": es_port, "index": "unittest", "type": "test_result"},
+            "saved_queries": {"host": "http://localhost", "port": es_port, "index": "saved_queries", "type": "query"},
+            "debug": debug
+        }
+        self.config = NamedTemporaryFile(delete=False, suffix=".json")
+        self.config.write(value2json(settings).encode("utf8"))
+        self.config.close()
+
+        env = dict(os.environ)
+        env[b"ACTIVEDATA_CONFIG"] = self.config.name.encode("utf8")
+        env[b"PYTHONPATH"] = os.pathsep.join([".", "vendor"]).encode("utf8")
+        self.url = "http://localhost:" + str(port)
+        self.process = subprocess.Popen(
+            [
+                sys.executable, "-m", "gunicorn.app.wsgiapp",
+                "--config", "resources/config/gunicorn.py",
+                "--bind", "localhost:" + str(port),
+                "--workers", str(workers),
+                "--threads", str(threads),
+                "--access-logfile", "/dev/null",
+                "--error-logfile", "-",
+                "active_data.app:flask_app"
+            ],
+            env=env
+        )
+
+        deadline = time() + STARTUP_TIMEOUT
+        while time() < deadline:
+            if self.process.poll() is not None:
+                Log.error("gunicorn did not start")
+            if _send(self.url, "GET", "/", None) == 200:
+                return
+            Till(seconds=0.5).wait()
+        self.stop()
+        Log.error("gunicorn did not answer after {{timeout}} seconds", timeout=STARTUP_TIMEOUT)
+
+    def stop(self):
+        if self.process.poll() is None:
+            self.process.terminate()
+            self.process.wait()
+        File(self.config.name).delete()
+
+
+def run(config):
+    """
+    :return: LIST OF {"workers", "threads", "summary"}, ONE FOR EACH WORKER COUNT
+    """
+    mix = Mix(config)
+    results = []
+    if config.url:
+        summary = _load(config.url, mix, config)
+        results.append(wrap({"workers": None, "threads": None, "summary": summary}))
+        return results
+
+    stub = StubES(Recording(config.recording), Synthetic({
+        alias: json2value(File(mapping).read())
+        for alias, mapping in config.mappings.items()
+    }))
+    try:
+        for workers in config.workers:
+            service = Service(workers, config.threads, config.port, stub.port, config.service_debug)
+            try:
+                summary = _load(service.url, mix, config)
+            finally:
+                service.stop()
+            results.append(wrap({"workers": workers, "threads": config.threads, "summary": summary}))
+            Log.note("{{workers}} workers\n{{report}}", workers=workers, report=report(results[-1:]))
+    finally:
+        stub.stop()
+    return results
+
+
+def _load(url, mix, config):
+    if config.rate:
+        open_loop(url, mix, config.rate, config.warmup)
+        return summarize(open_loop(url, mix, config.rate, config.duration), config.duration)
+    else:
+        closed_loop(url, mix, config.concurrency, config.warmup)
+        return summarize(closed_loop(url, mix, config.concurrency, config.duration), config.duration)
+
+
+def main():
+    try:
+        config = startup.read_settings()
+        constants.set(config.constants)
+        Log.start(config.debug)
+
+        results = run(config)
+        Log.note("Load test\n{{report}}", report=report(results))
+        if config.results:
+            File(config.results).write(value2json(results, pretty=True))
+    except Exception as e:
+        Log.error("Problem with load test", cause=e)
+    finally:
+        Log.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,653 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Author: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+"""
+REPLAY jx QUERIES THROUGH THE PYTHON LAYERS, AGAINST AN ES STUB, AND TIME EACH STAGE
+
+    python tests/replay.py --settings=tests/config/replay_settings.json             # COMPARE TO BASELINE
+    python tests/replay.py --settings=tests/config/replay_settings.json --save      # MAKE NEW BASELINE
+    python tests/replay.py --settings=tests/config/replay_settings.json --record=http://localhost:9200
+
+THE STUB ANSWERS WITH THE RECORDED RESPONSE FOR A REQUEST, IF THERE IS ONE; OTHERWISE IT MAKES
+A RESPONSE OF THE RIGHT SHAPE FROM THE REQUEST AND THE MAPPING. --record PASSES EVERY REQUEST
+TO A REAL ES, AND KEEPS THE RESPONSES FOR NEXT TIME.
+"""
+from __future__ import division
+from __future__ import unicode_literals
+
+import gc
+import json
+import re
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from SocketServer import ThreadingMixIn
+from collections import Mapping
+from random import Random
+from time import clock, time
+
+from jx_base import container
+from jx_base.container import Container
+from jx_elasticsearch.es09.util import post as es_post
+from jx_elasticsearch.es52 import ES52
+from jx_elasticsearch.es52.aggs import is_aggsop
+from jx_elasticsearch.es52.util import AGGS_FILTER_PATH, SETOP_FILTER_PATH
+from jx_python import jx, wrap_from
+from mo_dots import wrap, unwrap, split_field
+from mo_files import File
+from mo_future import text_type
+from mo_json import json2value, value2json
+from mo_logs import Log, constants, startup
+from mo_threads import Thread
+from mo_times.timer import Timer
+from pyLibrary.convert import unicode2utf8
+from pyLibrary.env import http
+from pyLibrary.env.elasticsearch import Deadline
+
+STAGES = ["parse", "schema", "normalize", "translate", "es", "decode", "format", "serialize"]
+NOT_COMPARED = ["es"]  # THE STUB'S TIME, NOT OURS
+MIN_SLACK = 0.0005  # SECONDS; A SMALLER CHANGE IS NOISE
+TIMEOUT = 60  # SECONDS
+
+ES_VERSION = "6.2.4"
+NUM_DOCS = 1000000  # SIZE OF THE SYNTHETIC INDEX
+CARDINALITY = 100  # DISTINCT keyword VALUES
+MAX_BUCKETS = 2000  # MOST BUCKETS IN A SYNTHETIC AGGREGATION, ACROSS ALL LEVELS
+MAX_HITS = 1000
+
+
+def load_queries(paths, request_logs=None):
+    """
+    :param paths: LIST OF *.jx FILES, OR DIRECTORIES OF THEM
+    :param request_logs: FILE OF JSON RECORDS, ONE PER LINE, AS WRITTEN BY record_request()
+    :return: LIST OF (name, query) PAIRS
+    """
+    output = []
+    for path in paths:
+        f = File(path)
+        files = sorted((c for c in f.children if c.extension == "jx"), key=lambda c: c.name) if f.is_directory() else [f]
+        for c in files:
+            output.append((c.name, json2value(_fill_templates(c.read()), flexible=True)))
+
+    if request_logs:
+        for i, line in enumerate(File(request_logs).read_lines()):
+            if not line.strip():
+                continue
+            record = json2value(line)
+            record = record.value or record
+            if not record.path.startswith("/query") or not record.query_text:
+                continue
+            query = json2value(record.query_text)
+            if isinstance(query, Mapping):
+                output.append(("log " + str(i), query))
+    return output
+
+
+def _fill_templates(text):
+    # "{{today|week}}" IS A jx DATE EXPRESSION; THE BRACES ARE FOR HUMANS TO FILL
+    return re.sub(r"\{\{(.*?)\}\}", r"\1", text)
+
+
+def replay(queries, port, alias="unittest", repeat=10):
+    """
+    :param queries: LIST OF (name, query) PAIRS
+    :param port: THE ES STUB
+    :param repeat: NUMBER OF TIMED RUNS OF EACH QUERY, AFTER ONE UNTIMED RUN
+    :return: (runs, errors) WHERE runs IS A LIST OF {stage: {"wall", "cpu", "objects"}}, AND
+             errors MAPS QUERY NAME TO ERROR MESSAGE
+    """
+    container.type2container.setdefault("elasticsearch", ES52)
+    container.config.default = {
+        "type": "elasticsearch",
+        "settings": {"host": "http://localhost", "port": port, "index": alias, "type": "test_result"}
+    }
+    runs = []
+    errors = {}
+    for name, query in queries:
+        query = json2value(value2json(query))
+        if isinstance(query["from"], Mapping) and query["from"].settings.index:
+            # THE STUB STANDS IN FOR WHATEVER CLUSTER THE QUERY NAMED
+            query["from"] = query["from"].settings.index
+        text = unicode2utf8(value2json(query))
+
+        try:
+            _run_one(text)  # WARM THE CACHES
+        except Exception as e:
+            errors[name] = e.message if hasattr(e, "message") else str(e)
+            continue
+
+        # gc IS OFF SO gc.get_count() COUNTS THE OBJECTS EACH STAGE LEAVES BEHIND
+        gc.disable()
+        try:
+            for _ in range(repeat):
+                runs.append(_run_one(text))
+                gc.collect()
+        finally:
+            gc.enable()
+    return runs, errors
+
+
+def _run_one(text):
+    timings = {}
+    with Deadline(seconds=TIMEOUT) as deadline:
+        with _Stage(timings, "parse"):
+            data = json2value(text)
+        with _Stage(timings, "schema"):
+            frum = wrap_from(data["from"])
+
+        if isinstance(frum, ES52):
+            with _Stage(timings, "normalize"):
+                query = frum._normalize(data)
+            with _Stage(timings, "translate"):
+                compiled = frum._compile(query)
+            if compiled:
+                es_query, format_result = compiled
+                filter_path = AGGS_FILTER_PATH if is_aggsop(frum._es, query) else SETOP_FILTER_PATH
+                with _Stage(timings, "es"):
+                    with Timer("es", silent=True) as es_timer:
+                        response = es_post(frum._es, es_query, query.limit, filter_path=filter_path)
+                with _Stage(timings, "format"):
+                    result = format_result(response, es_timer.duration)
+            else:
+                # MORE THAN ONE ES REQUEST; THE ES TIME IS TAKEN OUT OF translate, BELOW
+                with _Stage(timings, "translate", add=True):
+                    result = frum.query(query)
+        else:
+            with _Stage(timings, "translate"):
+                result = jx.run(data, frum=frum)
+
+        with _Stage(timings, "format", add=True):
+            if isinstance(result, Container):
+                result = result.format(data.format)
+        with _Stage(timings, "serialize"):
+            unicode2utf8(value2json(result))
+
+    _split_es(timings, deadline)
+    return timings
+
+
+def _split_es(timings, deadline):
+    """
+    THE Deadline KNOWS HOW LONG ES TOOK, AND HOW LONG THE RESPONSE TOOK TO DECODE; decode IS
+    ALL CPU, AND IT MADE THE OBJECTS
+    """
+    es = timings.get("es")
+    if es:
+        decode_wall = min(deadline.decode, es["wall"])
+        decode_cpu = min(deadline.decode, es["cpu"])
+        timings["decode"] = {"wall": decode_wall, "cpu": decode_cpu, "objects": es["objects"]}
+        timings["es"] = {"wall": es["wall"] - decode_wall, "cpu": es["cpu"] - decode_cpu, "objects": 0}
+    elif deadline.round_trip:
+        # ES WAS CALLED FROM INSIDE translate
+        translate = timings["translate"]
+        es_wall = min(deadline.round_trip, translate["wall"])
+        decode_wall = min(deadline.decode, translate["wall"] - es_wall)
+        decode_cpu = min(deadline.decode, translate["cpu"])
+        timings["es"] = {"wall": es_wall, "cpu": 0, "objects": 0}
+        timings["decode"] = {"wall": decode_wall, "cpu": decode_cpu, "objects": 0}
+        translate["wall"] -= es_wall + decode_wall
+        translate["cpu"] -= decode_cpu
+
+
+class _Stage(object):
+    """
+    RECORD THE WALL TIME, CPU TIME, AND NET NEW OBJECTS OF A STAGE
+    """
+    __slots__ = ["timings", "name", "add", "wall", "cpu", "objects"]
+
+    def __init__(self, timings, name, add=False):
+        self.timings = timings
+        self.name = name
+        self.add = add
+
+    def __enter__(self):
+        self.objects = gc.get_count()[0]
+        self.cpu = clock()
+        self.wall = time()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        sample = {
+            "wall": time() - self.wall,
+            "cpu": clock() - self.cpu,
+            "objects": gc.get_count()[0] - self.objects
+        }
+        previous = self.timings.get(self.name)
+        if self.add and previous:
+            for k, v in sample.items():
+                previous[k] += v
+        else:
+            self.timings[self.name] = sample
+
+
+def summarize(runs, errors):
+    """
+    :return: {"stages": {stage: {"wall": {p50, p99}, "cpu": {p50, p99}, "objects": {p50}}}, "total": ..., "errors": ...}
+    """
+    stages = {}
+    for stage in STAGES:
+        samples = [r[stage] for r in runs if stage in r]
+        if not samples:
+            continue
+        stages[stage] = {
+            "wall": _percentiles([s["wall"] for s in samples]),
+            "cpu": _percentiles([s["cpu"] for s in samples]),
+            "objects": {"p50": _percentile([s["objects"] for s in samples], 0.5)}
+        }
+    totals = [sum(s["wall"] for s in r.values()) for r in runs]
+    return wrap({
+        "stages": stages,
+        "total": _percentiles(totals) if totals else {},
+        "runs": len(runs),
+        "errors": errors
+    })
+
+
+def _percentiles(values):
+    return {"p50": _percentile(values, 0.5), "p99": _percentile(values, 0.99)}
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def report(summary):
+    """
+    :return: TEXT TABLE OF THE summary
+    """
+    lines = ["stage       cpu p50   cpu p99  wall p50  wall p99   objects"]
+    for stage in STAGES:
+        s = summary.stages[stage]
+        if not s:
+            continue
+        lines.append("%-9s %8.2fms %8.2fms %8.2fms %8.2fms %9d" % (
+            stage,
+            s.cpu.p50 * 1000,
+            s.cpu.p99 * 1000,
+            s.wall.p50 * 1000,
+            s.wall.p99 * 1000,
+            s.objects.p50
+        ))
+    lines.append("%-9s %8s   %8s   %8.2fms %8.2fms" % ("total", "", "", summary.total.p50 * 1000, summary.total.p99 * 1000))
+    for name, error in sorted(summary.errors.items()):
+        lines.append("ERROR " + name + ": " + error.split("\n")[0])
+    return "\n".join(lines)
+
+
+def compare(summary, baseline, tolerance=0.25):
+    """
+    :return: LIST OF REGRESSIONS, AS TEXT; EMPTY IF summary IS NO WORSE THAN baseline
+    """
+    output = []
+    for stage in STAGES:
+        if stage in NOT_COMPARED:
+            continue
+        old = baseline.stages[stage].cpu.p50
+        new = summary.stages[stage].cpu.p50
+        if old == None or new == None:
+            continue
+        if new > old * (1 + tolerance) + MIN_SLACK:
+            output.append("%s cpu p50 went from %.2fms to %.2fms" % (stage, old * 1000, new * 1000))
+    for name in summary.errors.keys():
+        if name not in baseline.errors.keys():
+            output.append(name + " now fails")
+    return output
+
+
+class Recording(object):
+    """
+    ES RESPONSES, KEYED BY REQUEST
+    """
+
+    def __init__(self, filename=None):
+        self.file = File(filename) if filename else None
+        self.exchanges = {}  # MAP FROM REQUEST KEY TO {"status", "content"}
+        if self.file and self.file.exists:
+            for e in json2value(self.file.read()):
+                self.exchanges[e.key] = {"status": e.status, "content": e.content}
+
+    def get(self, method, path, body):
+        return self.exchanges.get(_request_key(method, path, body))
+
+    def add(self, method, path, body, status, content):
+        self.exchanges[_request_key(method, path, body)] = {"status": status, "content": content}
+
+    def save(self):
+        self.file.write(value2json(
+            [{"key": k, "status": v["status"], "content": v["content"]} for k, v in sorted(self.exchanges.items())],
+            pretty=True
+        ))
+
+
+def _request_key(method, path, body):
+    # THE QUERY STRING (filter_path, timeout) AND THE BODY timeout CHANGE WITHOUT CHANGING THE ANSWER
+    path = path.split("?")[0]
+    try:
+        body = json.loads(body)
+        if isinstance(body, dict):
+            body.pop("timeout", None)
+        body = json.dumps(body, sort_keys=True)
+    except Exception:
+        pass
+    return method + " " + path + " " + (body or "")
+
+
+class Synthetic(object):
+    """
+    RESPONSES OF THE RIGHT SHAPE, FOR INDEXES WITH THE GIVEN MAPPINGS; THE SAME REQUEST
+    ALWAYS GETS THE SAME RESPONSE
+    """
+
+    def __init__(self, indexes):
+        """
+        :param indexes: MAP FROM ALIAS TO MAPPING
+        """
+        self.indexes = [_Index(alias, mapping) for alias, mapping in indexes.items()]
+
+    def answer(self, method, path, body):
+        """
+        :return: (status, content)
+        """
+        path = path.split("?")[0]
+        if path == "/":
+            return 200, {"version": {"number": ES_VERSION}}
+        elif path.startswith("/_cluster/state"):
+            return 200, {"metadata": {"indices": {
+                i.name: {"aliases": [i.alias], "mappings": i.mapping} for i in self.indexes
+            }}}
+        elif path.startswith("/_alias"):
+            return 200, {i.name: {"aliases": {i.alias: {}}} for i in self.indexes}
+        elif path.endswith("/_bulk"):
+            num = len([l for l in (body or b"").split(b"\n") if l.strip()]) // 2
+            return 200, {"errors": False, "items": [{"index": {"_id": str(i), "status": 201}} for i in range(num)]}
+
+        index = self._find(path.split("/")[1])
+        if path.endswith("/_mapping") and index:
+            return 200, {index.name: {"mappings": index.mapping}}
+        elif path.endswith("/_search") and index:
+            body = json.loads(body or "{}")
+            return 200, index.search(body, Random(_request_key(method, path, json.dumps(body))))
+        elif method in ("POST", "PUT"):
+            # WRITES (_refresh, _aliases, _update_by_query, ...) ARE NOT KEPT
+            return 200, {"acknowledged": True, "_shards": {"total": 1, "successful": 1, "failed": 0}}
+        else:
+            return 404, {"error": "stub does not know " + method + " " + path}
+
+    def _find(self, name):
+        for i in self.indexes:
+            if name in (i.alias, i.name):
+                return i
+        return None
+
+
+class _Index(object):
+
+    def __init__(self, alias, mapping):
+        self.alias = alias
+        self.name = alias + "20170101_000000"
+        self.mapping = unwrap(mapping)
+        self.types = {}  # MAP FROM FIELD TO ES TYPE
+        for type_name, m in self.mapping.items():
+            self.type_name = type_name
+            _leaves(m["properties"], [], self.types)
+
+    def search(self, body, rng):
+        size = min(body.get("size", 10), NUM_DOCS, MAX_HITS)
+        output = {
+            "took": 1,
+            "timed_out": False,
+            "_shards": {"total": 5, "successful": 5, "failed": 0},
+            "hits": {"total": NUM_DOCS, "max_score": 1, "hits": [self._hit(body, i, rng) for i in range(size)]}
+        }
+        if body.get("aggs"):
+            output["aggregations"] = self._aggs(body["aggs"], NUM_DOCS, MAX_BUCKETS, rng)
+        return output
+
+    def _hit(self, body, i, rng):
+        output = {"_index": self.name, "_type": self.type_name, "_id": str(i), "_score": 1}
+        stored_fields = body.get("stored_fields")
+        if stored_fields is None or body.get("_source") or "_source" in stored_fields:
+            doc = {}
+            for field, type_ in self.types.items():
+                _set(doc, split_field(field), _value(type_, rng))
+            output["_source"] = doc
+        elif stored_fields:
+            output["fields"] = {f: [_value(self.types.get(f, "keyword"), rng)] for f in stored_fields}
+        return output
+
+    def _aggs(self, aggs, doc_count, budget, rng):
+        output = {}
+        for name, agg in aggs.items():
+            sub = agg.get("aggs", {})
+            if "terms" in agg:
+                type_ = self.types.get(agg["terms"].get("field"), "keyword")
+                num = max(1, min(agg["terms"].get("size", 10), 2 if type_ == "boolean" else CARDINALITY, budget))
+                output[name] = {"doc_count_error_upper_bound": 0, "sum_other_doc_count": 0, "buckets": [
+                    self._bucket({"key": _key(type_, i)}, doc_count // num, sub, budget // num, rng)
+                    for i in range(num)
+                ]}
+            elif "range" in agg:
+                ranges = agg["range"]["ranges"]
+                output[name] = {"buckets": [
+                    self._bucket(
+                        {"key": str(r.get("from", "*")) + "-" + str(r.get("to", "*")), "from": r.get("from"), "to": r.get("to")},
+                        doc_count // len(ranges),
+                        sub,
+                        budget // len(ranges),
+                        rng
+                    )
+                    for r in ranges
+                ]}
+            elif "histogram" in agg:
+                histogram = agg["histogram"]
+                interval = histogram["interval"]
+                bounds = histogram.get("extended_bounds")
+                if bounds:
+                    start = bounds["min"]
+                    num = int(round((bounds["max"] - bounds["min"]) / interval)) + 1
+                else:
+                    start = histogram.get("offset", 0)
+                    num = CARDINALITY
+                num = max(1, min(num, budget))
+                output[name] = {"buckets": [
+                    self._bucket({"key": start + i * interval}, doc_count // num, sub, budget // num, rng)
+                    for i in range(num)
+                ]}
+            elif "filters" in agg:
+                filters = agg["filters"]["filters"]
+                num = max(1, len(filters))
+                if isinstance(filters, dict):
+                    buckets = {k: self._bucket({}, doc_count // num, sub, budget // num, rng) for k in filters}
+                else:
+                    buckets = [self._bucket({}, doc_count // num, sub, budget // num, rng) for _ in filters]
+                output[name] = {"buckets": buckets}
+            elif "filter" in agg or "nested" in agg or "reverse_nested" in agg or "missing" in agg:
+                output[name] = self._bucket({}, rng.randint(0, doc_count), sub, budget, rng)
+            elif "extended_stats" in agg:
+                output[name] = _stats(doc_count, rng, extended=True)
+            elif "stats" in agg:
+                output[name] = _stats(doc_count, rng)
+            elif "percentiles" in agg:
+                percents = agg["percentiles"].get("percents", [1, 5, 25, 50, 75, 95, 99])
+                output[name] = {"values": {repr(float(p)): rng.random() * p for p in percents}}
+            elif "cardinality" in agg or "value_count" in agg:
+                output[name] = {"value": rng.randint(0, doc_count)}
+            elif "sum" in agg or "min" in agg or "max" in agg or "avg" in agg:
+                output[name] = {"value": rng.random() * doc_count}
+            else:
+                Log.error("Do not know how to make a response for {{agg|json}}", agg=agg)
+        return output
+
+    def _bucket(self, bucket, doc_count, sub, budget, rng):
+        bucket["doc_count"] = doc_count
+        bucket.update(self._aggs(sub, doc_count, max(1, budget), rng))
+        return bucket
+
+
+def _leaves(properties, path, output):
+    for name, p in properties.items():
+        if "properties" in p:
+            _leaves(p["properties"], path + [name], output)
+        else:
+            output[".".join(path + [name])] = p["type"]
+
+
+def _set(doc, path, value):
+    for step in path[:-1]:
+        doc = doc.setdefault(step, {})
+    doc[path[-1]] = value
+
+
+def _key(type_, i):
+    if type_ == "keyword":
+        return "v" + str(i)
+    return i
+
+
+def _value(type_, rng):
+    if type_ == "keyword":
+        return "v" + str(rng.randint(0, CARDINALITY - 1))
+    elif type_ == "boolean":
+        return rng.random() < 0.5
+    elif type_ == "integer":
+        return rng.randint(0, 1000000)
+    else:
+        return 1500000000 + rng.random() * 10000000
+
+
+def _stats(count, rng, extended=False):
+    lo = rng.random()
+    hi = lo + rng.random() * 1000
+    output = {"count": count, "min": lo, "max": hi, "avg": (lo + hi) / 2, "sum": count * (lo + hi) / 2}
+    if extended:
+        output["sum_of_squares"] = count * hi * hi
+        output["variance"] = (hi - lo) ** 2 / 12
+        output["std_deviation"] = output["variance"] ** 0.5
+    return output
+
+
+class StubES(object):
+    """
+    AN ES THAT ANSWERS FROM A Recording, THEN FROM A Synthetic; OR, WITH record_url, FROM A
+    REAL ES (ADDING TO THE Recording)
+    """
+
+    def __init__(self, recording, synthetic, record_url=None):
+        self.server = _StubServer(("localhost", 0), _StubHandler)
+        self.server.recording = recording
+        self.server.synthetic = synthetic
+        self.server.record_url = record_url
+        Thread.run("es stub", lambda please_stop: self.server.serve_forever())
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    def stop(self):
+        self.server.shutdown()
+
+
+class _StubServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+
+    def _answer(self, method):
+        body = self.rfile.read(int(self.headers.get("content-length", 0) or 0))
+        server = self.server
+        if server.record_url:
+            response = http.request(method, server.record_url + self.path, data=body, headers={"Content-Type": "application/json"})
+            status, content = response.status_code, response.all_content.decode("utf8")
+            server.recording.add(method, self.path, body, status, content)
+        else:
+            recorded = server.recording.get(method, self.path, body)
+            if recorded:
+                status, content = recorded["status"], recorded["content"]
+            else:
+                # MADE ONCE, SO THE es STAGE IS NOT THE TIME TO MAKE A RESPONSE
+                status, content = server.synthetic.answer(method, self.path, body)
+                content = json.dumps(content)
+                server.recording.add(method, self.path, body, status, content)
+
+        content = content.encode("utf8") if isinstance(content, text_type) else content
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        if method != "HEAD":
+            self.wfile.write(content)
+
+    def do_GET(self):
+        self._answer("GET")
+
+    def do_HEAD(self):
+        self._answer("HEAD")
+
+    def do_POST(self):
+        self._answer("POST")
+
+    def log_message(self, format, *args):
+        pass
+
+
+def run(config, save=False, record=None):
+    """
+    :return: (summary, regressions)
+    """
+    queries = load_queries(config.queries, config.request_logs)
+    recording = Recording(config.recording)
+    synthetic = Synthetic({config.alias: json2value(File(config.mapping).read())})
+    stub = StubES(recording, synthetic, record_url=record)
+    try:
+        runs, errors = replay(queries, stub.port, alias=config.alias, repeat=config.repeat)
+    finally:
+        stub.stop()
+
+    summary = summarize(runs, errors)
+    if record:
+        recording.save()
+
+    baseline = File(config.baseline)
+    if save or not baseline.exists:
+        baseline.write(value2json(summary, pretty=True))
+        return summary, []
+    return summary, compare(summary, json2value(baseline.read()), config.tolerance)
+
+
+def main():
+    try:
+        config = startup.read_settings(defs=[
+            {
+                "name": ["--save"],
+                "help": "replace the baseline with this run",
+                "action": "store_true",
+                "dest": "save"
+            },
+            {
+                "name": ["--record"],
+                "help": "URL of a real ES, to record responses from",
+                "type": str,
+                "dest": "record"
+            }
+        ])
+        constants.set(config.constants)
+        Log.start(config.debug)
+
+        summary, regressions = run(config, save=config.args.save, record=config.args.record)
+        Log.note("{{num}} runs\n{{report}}", num=summary.runs, report=report(summary))
+        if regressions:
+            Log.error("Slower than baseline:\n{{regressions|indent}}", regressions="\n".join(regressions))
+    except Exception as e:
+        Log.error("Problem with replay", cause=e)
+    finally:
+        Log.stop()
+
+
+if __name__ == "__main__":
+    main()
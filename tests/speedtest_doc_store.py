@@ -0,0 +1,115 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Author: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+
+from __future__ import division
+from __future__ import unicode_literals
+
+import gc
+from random import Random
+
+from jx_python import jx
+from jx_python.containers.doc_store import DocStore
+from jx_python.containers.list_usingPythonList import ListContainer
+from mo_dots import unwrap
+from mo_logs import Log
+from mo_testing.fuzzytestcase import FuzzyTestCase
+from mo_times.timer import Timer
+
+NUM_ROWS = 500000
+
+QUERIES = [
+    ("eq", {"select": "i", "where": {"eq": {"status": "error"}}}),
+    ("range", {"select": "i", "where": {"and": [{"gte": {"duration": 0.25}}, {"lt": {"duration": 0.5}}]}}),
+    ("prefix", {"select": "i", "where": {"prefix": {"url.path": "/query"}}}),
+    ("sort", {"select": "i", "where": {"eq": {"code": 500}}, "sort": [{"duration": "desc"}]})
+]
+
+
+class TestDocStoreSpeed(FuzzyTestCase):
+    """
+    QUERY REQUEST-LOG-LIKE DOCUMENTS, COLUMNAR AGAINST A LIST OF dicts
+    """
+
+    def test_queries(self):
+        data = _data()
+        with Timer("load columns") as load_timer:
+            store = DocStore("requests", data)
+        Log.note("loaded {{num}} rows at {{rate|comma}} rows/sec", num=NUM_ROWS, rate=int(NUM_ROWS / load_timer.duration.seconds))
+
+        container = ListContainer("requests", data)
+        _ = container.schema  # SCAN BEFORE TIMING
+
+        for name, query in QUERIES:
+            gc.collect()  # SO A COLLECTION OF THE SOURCE dicts DOES NOT LAND IN ONE TIMER
+            with Timer("list") as slow_timer:
+                expected = jx.run(dict(query, **{"from": container, "limit": NUM_ROWS, "format": "list"}))
+            gc.collect()
+            with Timer("columnar") as fast_timer:
+                result = store.query(dict(query, **{"from": store, "limit": NUM_ROWS, "format": "list"}))
+
+            # ListContainer IGNORES THE limit, DocStore STOPS AT jx_base.query.MAX_LIMIT
+            self.assertAlmostEqual(unwrap(result.data), unwrap(expected.data)[:len(result.data)], places=6)
+            _report(name, slow_timer, fast_timer)
+
+    def test_groupby(self):
+        data = _data()
+        store = DocStore("requests", data)
+
+        # ListContainer CAN NOT groupby INTO format=list, SO COMPARE TO jx.groupby
+        with Timer("list") as slow_timer:
+            expected = []
+            for key, group in jx.groupby(data, ["status", "code"], sort_keys=True):
+                durations = [g["duration"] for g in unwrap(group)]
+                expected.append({
+                    "status": key["status"],
+                    "code": key["code"],
+                    "count": len(durations),
+                    "total": sum(durations),
+                    "slowest": max(durations)
+                })
+        with Timer("columnar") as fast_timer:
+            result = store.query({
+                "from": store,
+                "groupby": ["status", "code"],
+                "select": [
+                    {"aggregate": "count"},
+                    {"name": "total", "value": "duration", "aggregate": "sum"},
+                    {"name": "slowest", "value": "duration", "aggregate": "max"}
+                ],
+                "format": "list"
+            })
+
+        self.assertAlmostEqual(unwrap(result.data), expected, places=6)
+        _report("groupby", slow_timer, fast_timer)
+
+
+def _data():
+    rng = Random(42)
+    return [
+        {
+            "i": i,
+            "status": rng.choice(["ok", "ok", "ok", "error", "timeout"]),
+            "code": rng.choice([200, 200, 404, 500]),
+            "duration": rng.random(),
+            "url": {"path": rng.choice(["/query", "/query/sql", "/tasks/1", "/json"])}
+        }
+        for i in range(NUM_ROWS)
+    ]
+
+
+def _report(name, slow_timer, fast_timer):
+    Log.note(
+        "{{name}} over {{num}} rows: list {{slow|comma}} rows/sec, columnar {{fast|comma}} rows/sec ({{speedup|round(places=1)}}x)",
+        name=name,
+        num=NUM_ROWS,
+        slow=int(NUM_ROWS / slow_timer.duration.seconds),
+        fast=int(NUM_ROWS / fast_timer.duration.seconds),
+        speedup=slow_timer.duration.seconds / fast_timer.duration.seconds
+    )
@@ -0,0 +1,153 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Author: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+
+from __future__ import division
+from __future__ import unicode_literals
+
+from collections import Mapping
+
+from jx_elasticsearch.es52.util import AGGS_FILTER_PATH
+from mo_dots import split_field
+from mo_json import json2value, value2json
+from mo_logs import Log
+from mo_logs.strings import utf82unicode
+from mo_math.randoms import Random
+from mo_testing.fuzzytestcase import FuzzyTestCase
+from mo_times.timer import Timer
+
+EDGE_SIZES = [30, 40, 40]  # 48000 LEAF BUCKETS
+NUM_REPEAT = 3  # ONE DECODE IS TOO NOISY (GC)
+
+
+class TestESDecodeSpeed(FuzzyTestCase):
+    """
+    REPLAY A LARGE AGGREGATION RESPONSE THROUGH THE DECODE PATH USED BY Cluster.post()
+    """
+
+    def test_aggs_response(self):
+        response = _aggs_response()
+        content = value2json(response).encode("utf8")
+        filtered = value2json(filter_path(response, AGGS_FILTER_PATH)).encode("utf8")
+
+        with Timer("decode unicode copy") as unicode_timer:
+            for _ in range(NUM_REPEAT):
+                expected = json2value(utf82unicode(content))
+        with Timer("decode utf8") as utf8_timer:
+            for _ in range(NUM_REPEAT):
+                result = json2value(content)
+        with Timer("decode with filter_path") as filter_timer:
+            for _ in range(NUM_REPEAT):
+                projected = json2value(filtered)
+
+        self.assertEqual(result, expected)
+        self.assertEqual(projected.hits.total, expected.hits.total)
+        self.assertEqual(_leaves(projected.aggregations), _leaves(expected.aggregations))
+
+        Log.note(
+            "{{size|round(places=1)}}MB response: {{old|round(places=3)}}sec with unicode copy, {{new|round(places=3)}}sec from utf8",
+            size=len(content) / 1000000,
+            old=unicode_timer.duration.seconds / NUM_REPEAT,
+            new=utf8_timer.duration.seconds / NUM_REPEAT
+        )
+        Log.note(
+            "{{size|round(places=1)}}MB after filter_path: {{seconds|round(places=3)}}sec",
+            size=len(filtered) / 1000000,
+            seconds=filter_timer.duration.seconds / NUM_REPEAT
+        )
+
+
+def filter_path(value, paths):
+    """
+    WHAT ES DOES WITH THE filter_path PARAMETER (ONLY THE FORMS WE USE)
+    """
+    return _filter(value, [split_field(p) for p in paths])
+
+
+def _filter(value, paths):
+    if isinstance(value, list):
+        output = [_filter(v, paths) for v in value]
+        return [v for v in output if v is not None]
+    if not isinstance(value, Mapping):
+        return None
+
+    output = {}
+    for k, v in value.items():
+        if any(p[0] == k and len(p) == 1 for p in paths) or any(p[0] == "**" and p[1] == k and len(p) == 2 for p in paths):
+            output[k] = v
+            continue
+        deeper = [p[1:] for p in paths if p[0] == k and len(p) > 1] + [p for p in paths if p[0] == "**"]
+        deeper += [p[2:] for p in paths if p[0] == "**" and p[1] == k and len(p) > 2]
+        if deeper:
+            v = _filter(v, deeper)
+            if v:
+                output[k] = v
+    return output or None
+
+
+def _leaves(aggs):
+    """
+    THE PROPERTIES THE es52 DECODERS READ
+    """
+    output = []
+
+    def _walk(v):
+        if isinstance(v, Mapping):
+            for k in sorted(v.keys()):
+                if k in ("key", "doc_count", "sum", "avg"):
+                    output.append((k, v[k]))
+                else:
+                    _walk(v[k])
+        elif isinstance(v, list):
+            for vv in v:
+                _walk(vv)
+
+    _walk(aggs)
+    return output
+
+
+def _aggs_response():
+    def bucket(depth):
+        output = {
+            "key": Random.int(2000000000) * 1000,
+            "key_as_string": "2017-01-01T00:00:00.000Z",
+            "doc_count": Random.int(1000)
+        }
+        if depth < len(EDGE_SIZES):
+            output["_match"] = {
+                "doc_count_error_upper_bound": 0,
+                "sum_other_doc_count": 0,
+                "buckets": [bucket(depth + 1) for _ in range(EDGE_SIZES[depth])]
+            }
+            output["_missing"] = {"doc_count": 0}
+        else:
+            output["result\\.duration"] = {
+                "count": 3,
+                "min": 1.5,
+                "max": 2.5,
+                "avg": 2.0,
+                "sum": 6.0,
+                "sum_of_squares": 12.5,
+                "variance": 0.1667,
+                "std_deviation": 0.4082,
+                "std_deviation_bounds": {"upper": 2.8165, "lower": 1.1835}
+            }
+        return output
+
+    return {
+        "took": 5,
+        "timed_out": False,
+        "_shards": {"total": 5, "successful": 5, "failed": 0},
+        "hits": {"total": 1000000, "max_score": 0.0, "hits": []},
+        "aggregations": {"_match": {
+            "doc_count_error_upper_bound": 0,
+            "sum_other_doc_count": 0,
+            "buckets": [bucket(1) for _ in range(EDGE_SIZES[0])]
+        }}
+    }
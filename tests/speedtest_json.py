@@ -0,0 +1,79 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Author: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+
+from __future__ import division
+from __future__ import unicode_literals
+
+from mo_dots import wrap
+from mo_json.encoder import cPythonJSONEncoder
+from mo_logs import Log
+from mo_math.randoms import Random
+from mo_testing.fuzzytestcase import FuzzyTestCase
+from mo_times.dates import Date
+from mo_times.timer import Timer
+
+NUM_ROWS = 200000
+
+
+class TestJsonSpeed(FuzzyTestCase):
+    """
+    COMPARE THE ONE-PASS ENCODER TO THE ORIGINAL scrub()-THEN-ENCODE
+    """
+
+    def test_table_format(self):
+        now = Date.now().unix
+        result = wrap({
+            "meta": {"format": "table", "timing": {"es": 0.3}},
+            "header": ["build.branch", "run.suite", "result.ok", "result.duration", "count", "build.date"],
+            "data": [
+                [
+                    Random.string(10),
+                    Random.sample(["mochitest", "reftest", "xpcshell", " "], 1)[0],
+                    bool(i % 2),
+                    i / 7.0,
+                    float(i),
+                    now - i if i % 10 else None
+                ]
+                for i in range(NUM_ROWS)
+            ]
+        })
+        self._compare("table", result)
+
+    def test_list_format(self):
+        result = wrap({
+            "meta": {"format": "list"},
+            "data": [
+                {
+                    "build": {"branch": Random.string(10), "date": Date.now()},
+                    "run": {"suite": "mochitest", "chunk": i % 20, "empty": ""},
+                    "result": {"ok": bool(i % 2), "duration": i / 7.0, "missing": None}
+                }
+                for i in range(NUM_ROWS // 4)
+            ]
+        })
+        self._compare("list", result)
+
+    def _compare(self, name, value):
+        encoder = cPythonJSONEncoder()
+        with Timer("scrub then encode " + name) as old_timer:
+            expected = encoder.scrub_encode(value)
+        with Timer("one pass encode " + name) as new_timer:
+            result = encoder.encode(value)
+
+        self.assertEqual(result, expected)
+
+        size = len(result.encode("utf8")) / 1000000
+        Log.note(
+            "{{name}}: {{size|round(places=2)}}MB at {{old|round(places=2)}}MB/s scrubbing, {{new|round(places=2)}}MB/s in one pass",
+            name=name,
+            size=size,
+            old=size / old_timer.duration.seconds,
+            new=size / new_timer.duration.seconds
+        )
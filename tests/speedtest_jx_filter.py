@@ -0,0 +1,115 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Author: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+
+from __future__ import division
+from __future__ import unicode_literals
+
+from random import Random
+
+from jx_base.expressions import jx_expression
+from jx_python import jx
+from jx_python.containers.list_usingPythonList import ListContainer
+from jx_python.expressions import jx_expression_to_function, jx_expression_to_raw_function
+from mo_dots import wrap, unwrap, unwraplist, Data
+from mo_logs import Log
+from mo_testing.fuzzytestcase import FuzzyTestCase
+from mo_times.timer import Timer
+
+NUM_ROWS = 200000
+
+# WHERE CLAUSES LIKE THOSE IN tests/test_jx/test_filters.py
+WHERES = [
+    {"eq": ["a.b", "a.c"]},
+    {"eq": [{"add": ["a.b", 1]}, "a.c"]},
+    {"and": [{"exists": "v"}, {"regex": {"v": ".*b.*"}}]},
+    {"in": {"a.b": [1, 2, 3]}},
+    {"and": [{"exists": "v"}, {"prefix": {"v": "te"}}]},
+    {"and": [{"gt": {"a.b": 3}}, {"exists": "v"}]},
+    {"or": [{"missing": "a.c"}, {"lt": {"a.c": 2}}]}
+]
+
+SELECT = ["v", {"name": "b", "value": "a.b"}, {"name": "sum", "value": {"add": ["a.b", "i"]}}]
+
+
+class TestFilterSpeed(FuzzyTestCase):
+    """
+    FILTER AND SELECT OVER PLAIN dicts, AGAINST wrap()ING EVERY ROW, AS IT USED TO BE
+    """
+
+    def test_filter(self):
+        data = _data()
+        for where in WHERES:
+            with Timer("wrapped") as slow_timer:
+                expected = _wrapped_filter(data, where)
+            with Timer("raw") as fast_timer:
+                result = jx.filter(data, jx_expression(where))
+
+            self.assertEqual([r["i"] for r in result], [r["i"] for r in expected])
+            _report("filter " + jx_expression(where).to_python(), slow_timer, fast_timer)
+
+    def test_query(self):
+        data = _data()
+        container = ListContainer("test", data)
+        _ = container.schema  # SCAN BEFORE TIMING
+        query = {"from": container, "select": SELECT, "where": {"gt": {"a.b": 3}}, "format": "list"}
+        with Timer("raw") as fast_timer:
+            result = jx.run(query)
+
+        with Timer("wrapped") as slow_timer:
+            selects = [(s["name"] if isinstance(s, dict) else s, jx_expression_to_function(jx_expression(s["value"] if isinstance(s, dict) else s))) for s in SELECT]
+            expected = [_wrapped_select(d, selects) for d in _wrapped_filter(data, {"gt": {"a.b": 3}})]
+
+        self.assertEqual(unwrap(result.data), expected)
+        _report("query", slow_timer, fast_timer)
+
+    def test_fallback(self):
+        # WHOLE-row REFERENCES STILL SEE Data
+        self.assertIsNone(jx_expression_to_raw_function({"eq": {"row": 1}}))
+        self.assertIsNone(jx_expression_to_raw_function(lambda row: True))
+        self.assertIsNotNone(jx_expression_to_raw_function({"eq": {"a.b": 1}}))
+
+        data = [{"a": 1}, {"a": 2}]
+        self.assertEqual(jx.filter(data, lambda row, rownum, rows: row.a == 2), [{"a": 2}])
+
+
+def _wrapped_filter(data, where):
+    temp = jx_expression_to_function(jx_expression(where))
+    dd = wrap(data)
+    return [unwrap(d) for i, d in enumerate(data) if temp(wrap(d), i, dd)]
+
+
+def _wrapped_select(d, selects):
+    output = Data()
+    for n, p in selects:
+        output[n] = unwraplist(p(wrap(d)))
+    return unwrap(output)
+
+
+def _data():
+    rng = Random(42)
+    return [
+        {
+            "a": {"b": rng.randint(0, 9), "c": None if rng.random() < 0.2 else rng.randint(0, 9)},
+            "v": rng.choice(["test", "bat", "abba", None]),
+            "i": i
+        }
+        for i in range(NUM_ROWS)
+    ]
+
+
+def _report(name, slow_timer, fast_timer):
+    Log.note(
+        "{{name}} over {{num}} rows: wrapped {{slow|comma}} rows/sec, raw {{fast|comma}} rows/sec ({{speedup|round(places=1)}}x)",
+        name=name,
+        num=NUM_ROWS,
+        slow=int(NUM_ROWS / slow_timer.duration.seconds),
+        fast=int(NUM_ROWS / fast_timer.duration.seconds),
+        speedup=slow_timer.duration.seconds / fast_timer.duration.seconds
+    )
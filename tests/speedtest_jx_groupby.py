@@ -0,0 +1,108 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Author: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+
+from __future__ import division
+from __future__ import unicode_literals
+
+from random import Random
+
+from jx_python import jx
+from mo_logs import Log
+from mo_testing.fuzzytestcase import FuzzyTestCase
+from mo_times.timer import Timer
+
+NUM_ROWS = 200000
+CARDINALITY = 1000  # DISTINCT VALUES OF a
+KEYS = ["a", "b.c"]
+
+
+class TestGroupbySpeed(FuzzyTestCase):
+    """
+    jx.groupby (HASH) AGAINST SORTING THEN GROUPING CONTIGUOUS ROWS, AS IT USED TO BE
+    """
+
+    def test_hash(self):
+        data = _data()
+
+        with Timer("sort, then group") as slow_timer:
+            expected = list(jx.groupby(jx.sort(data, KEYS), KEYS, contiguous=True))
+        with Timer("hash group") as fast_timer:
+            result = list(jx.groupby(data, KEYS))
+        expected, result = _groups(expected), _groups(result)
+
+        self.assertEqual(sorted(result), sorted(expected))
+        # FIRST-SEEN ORDER
+        firsts = [ids[0] for _, ids in result]
+        self.assertEqual(firsts, sorted(firsts))
+        _report("hash", slow_timer, fast_timer)
+
+    def test_sort_keys(self):
+        data = _data()
+
+        with Timer("sort, then group") as slow_timer:
+            expected = list(jx.groupby(jx.sort(data, KEYS), KEYS, contiguous=True))
+        with Timer("hash group, sorted keys") as fast_timer:
+            result = list(jx.groupby(data, KEYS, sort_keys=True))
+        expected, result = _groups(expected), _groups(result)
+
+        self.assertEqual(result, expected)
+        _report("sort_keys", slow_timer, fast_timer)
+
+    def test_spill(self):
+        data = _data()
+        expected = _groups(jx.groupby(data, KEYS))
+
+        with Timer("hash group, spilled") as spill_timer:
+            result = list(jx.groupby(iter(data), KEYS, max_rows=NUM_ROWS // 10))
+        result = _groups(result)
+
+        self.assertEqual(sorted(result), sorted(expected))
+        Log.note("group {{num}} rows, spilled to disk: {{time|round(places=3)}}sec", num=NUM_ROWS, time=spill_timer.duration.seconds)
+
+
+def _data():
+    rng = Random(42)
+    return [
+        {
+            "a": rng.randint(0, CARDINALITY),
+            "b": {"c": rng.choice(["x", "y", None, ["x", "y"]])},
+            "i": i
+        }
+        for i in range(NUM_ROWS)
+    ]
+
+
+def _groups(groups):
+    """
+    :return: LIST OF (KEYS, ROW IDS), IN THE ORDER GIVEN
+    """
+    return [
+        (tuple(_hashable(k[name]) for name in KEYS), [v["i"] for v in values])
+        for k, values in groups
+    ]
+
+
+def _hashable(value):
+    if isinstance(value, list):
+        return tuple(value)
+    if value == None:
+        return None
+    return value
+
+
+def _report(name, slow_timer, fast_timer):
+    Log.note(
+        "group {{num}} rows ({{name}}): sort then group {{slow|round(places=3)}}sec, hash {{fast|round(places=3)}}sec ({{speedup|round(places=1)}}x)",
+        num=NUM_ROWS,
+        name=name,
+        slow=slow_timer.duration.seconds,
+        fast=fast_timer.duration.seconds,
+        speedup=slow_timer.duration.seconds / fast_timer.duration.seconds
+    )
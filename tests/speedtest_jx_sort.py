@@ -0,0 +1,117 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Author: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+
+from __future__ import division
+from __future__ import unicode_literals
+
+from random import Random
+
+from jx_python import jx
+from jx_python.jx import value_compare
+from mo_dots import wrap, unwrap
+from mo_future import sort_using_cmp
+from mo_logs import Log
+from mo_testing.fuzzytestcase import FuzzyTestCase
+from mo_times import Date
+from mo_times.timer import Timer
+
+NUM_ROWS = 200000
+NULL_RATE = 0.2
+MULTI_RATE = 0.3  # ROWS WITH A LIST IN b
+
+
+class TestSortSpeed(FuzzyTestCase):
+    """
+    jx.sort (KEY BASED) AGAINST A SORT USING value_compare() ON EVERY PAIR, AS IT USED TO BE
+    MIXED TYPES IN EVERY COLUMN: NUMBERS, BOOLEANS, STRINGS, DATES, AND NULLS OR LISTS
+    """
+
+    def test_ascending(self):
+        self._compare(["a", "b"])
+
+    def test_descending(self):
+        self._compare([{"a": "desc"}, {"b": "desc"}])
+
+    def test_mixed_directions(self):
+        self._compare([{"b": "desc"}, "a", {"i": "desc"}])
+
+    def test_values(self):
+        values = [r["a"] for r in _data()]
+
+        with Timer("value_compare") as slow_timer:
+            expected = sort_using_cmp(values, value_compare)
+        with Timer("jx.sort") as fast_timer:
+            result = jx.sort(values)
+
+        # SAME TYPES AND VALUES, IN THE SAME ORDER (1 == 1.0 == True, SO COMPARE TYPES TOO)
+        self.assertTrue(_types_and_values(unwrap(result)) == _types_and_values(expected), "expecting the same order")
+        _report("values", slow_timer, fast_timer)
+
+    def _compare(self, sort):
+        data = wrap(_data())
+        columns = [(s, 1) if isinstance(s, basestring) else (list(s.keys())[0], -1) for s in sort]
+
+        def comparer(left, right):
+            for name, direction in columns:
+                c = value_compare(left[name], right[name], direction)
+                if c:
+                    return c
+            return 0
+
+        with Timer("value_compare") as slow_timer:
+            expected = sort_using_cmp(data, comparer)
+        with Timer("jx.sort") as fast_timer:
+            result = jx.sort(data, sort)
+
+        self.assertEqual([r["i"] for r in result], [r["i"] for r in expected])
+        _report(sort, slow_timer, fast_timer)
+
+
+def _data():
+    rng = Random(42)
+
+    def scalar():
+        choice = rng.randint(0, 5)
+        if choice == 0:
+            return rng.randint(-50, 50)
+        elif choice == 1:
+            return rng.random() * 100 - 50
+        elif choice == 2:
+            return rng.choice([True, False])
+        elif choice == 3:
+            return rng.choice(["a", "b", "c", "é"])
+        elif choice == 4:
+            return Date(rng.randint(0, 100))
+        else:
+            return 10 ** 20 + rng.randint(0, 10)  # long
+
+    return [
+        {
+            "a": None if rng.random() < NULL_RATE else scalar(),
+            "b": [scalar() for _ in range(rng.randint(1, 3))] if rng.random() < MULTI_RATE else scalar(),
+            "i": i
+        }
+        for i in range(NUM_ROWS)
+    ]
+
+
+def _types_and_values(values):
+    return [(type(v), v) for v in values]
+
+
+def _report(sort, slow_timer, fast_timer):
+    Log.note(
+        "sort {{num}} rows by {{sort|json}}: value_compare {{slow|round(places=3)}}sec, jx.sort {{fast|round(places=3)}}sec ({{speedup|round(places=1)}}x)",
+        num=NUM_ROWS,
+        sort=sort,
+        slow=slow_timer.duration.seconds,
+        fast=fast_timer.duration.seconds,
+        speedup=slow_timer.duration.seconds / fast_timer.duration.seconds
+    )
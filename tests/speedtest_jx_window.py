@@ -0,0 +1,129 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Author: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+
+from __future__ import division
+from __future__ import unicode_literals
+
+import functools
+from random import Random
+
+from jx_base.expressions import jx_expression, TRUE
+from jx_python import jx
+from jx_python.windows import Count, Sum, Average, Min, Max, Percentile
+from mo_dots import wrap
+from mo_logs import Log
+from mo_math import MAX
+from mo_testing.fuzzytestcase import FuzzyTestCase
+from mo_times.timer import Timer
+
+NUM_ROWS = 100000
+NUM_GROUPS = 10
+NULL_RATE = 0.1
+RANGE = {"min": -100, "max": 1}  # THE 100 ROWS BEFORE, AND THIS ONE
+
+
+class TestWindowSpeed(FuzzyTestCase):
+    """
+    ROLLING WINDOWS, CALCULATED A COLUMN AT A TIME, AGAINST THE WindowFunction OBJECTS, ROW BY ROW
+    """
+
+    def test_count(self):
+        self._compare(Count, RowByRowCount)
+
+    def test_sum(self):
+        self._compare(Sum, RowByRowSum)
+
+    def test_average(self):
+        self._compare(Average, RowByRowAverage)
+
+    def test_min(self):
+        self._compare(Min, RowByRowMin)
+
+    def test_median(self):
+        self._compare(functools.partial(Percentile, percentile=0.5), functools.partial(RowByRowPercentile, percentile=0.5))
+
+    def test_max(self):
+        # Max CAN NOT sub(), SO COMPARE TO THE WINDOWS DONE THE LONG WAY
+        data = _data()
+        with Timer("columnar") as timer:
+            jx.window(data, _param(Max))
+
+        for g in range(NUM_GROUPS):
+            rows = sorted((r for r in data if r["g"] == g), key=lambda r: r["t"])
+            for i, r in enumerate(rows):
+                window = [w["v"] for w in rows[max(i + RANGE["min"], 0):max(i + RANGE["max"], 0)]]
+                self.assertEqual(r.get("w"), MAX(window))
+        Log.note("max over {{num}} rows: {{time|round(places=3)}}sec", num=NUM_ROWS, time=timer.duration.seconds)
+
+    def _compare(self, aggregate, row_by_row):
+        expected = _data()
+        with Timer("row by row") as slow_timer:
+            jx.window(expected, _param(row_by_row))
+
+        result = _data()
+        with Timer("columnar") as fast_timer:
+            jx.window(result, _param(aggregate))
+
+        for r, e in zip(result, expected):
+            self.assertAlmostEqual(r.get("w"), e.get("w"), places=6)
+
+        Log.note(
+            "{{name}} over {{num}} rows: row by row {{slow|round(places=3)}}sec, columnar {{fast|round(places=3)}}sec ({{speedup|round(places=1)}}x)",
+            name=row_by_row.__name__ if hasattr(row_by_row, "__name__") else row_by_row.func.__name__,
+            num=NUM_ROWS,
+            slow=slow_timer.duration.seconds,
+            fast=fast_timer.duration.seconds,
+            speedup=slow_timer.duration.seconds / fast_timer.duration.seconds
+        )
+
+
+# SUBCLASSES ARE NOT RECOGNIZED BY windows.sliding(), SO THEY ARE APPLIED ROW BY ROW
+class RowByRowCount(Count):
+    pass
+
+
+class RowByRowSum(Sum):
+    pass
+
+
+class RowByRowAverage(Average):
+    pass
+
+
+class RowByRowMin(Min):
+    pass
+
+
+class RowByRowPercentile(Percentile):
+    pass
+
+
+def _param(aggregate):
+    return wrap({
+        "name": "w",
+        "value": jx_expression("v"),
+        "edges": [{"value": jx_expression("g")}],
+        "where": TRUE,
+        "sort": "t",
+        "aggregate": aggregate,
+        "range": RANGE
+    })
+
+
+def _data():
+    rng = Random(42)
+    return [
+        {
+            "g": rng.randint(0, NUM_GROUPS - 1),
+            "t": i,
+            "v": None if rng.random() < NULL_RATE else rng.choice([rng.randint(0, 1000), rng.random() * 1000])
+        }
+        for i in range(NUM_ROWS)
+    ]
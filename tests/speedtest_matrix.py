@@ -0,0 +1,66 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Author: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+
+from __future__ import division
+from __future__ import unicode_literals
+
+import sys
+from random import Random
+
+from mo_collections.matrix import Matrix
+from mo_logs import Log
+from mo_testing.fuzzytestcase import FuzzyTestCase
+from mo_times.timer import Timer
+
+DIMS = (101, 51, 41)  # A 3-EDGE CUBE, WITH THE null PARTS
+
+
+class TestMatrixSpeed(FuzzyTestCase):
+    """
+    FILL AND FORMAT A 3-EDGE CUBE, AS es52/format.py DOES
+    """
+
+    def test_fill_and_format(self):
+        rng = Random(42)
+        cells = [(c, rng.random() * 1000 if rng.random() < 0.9 else None) for c in Matrix(dims=DIMS)._all_combos()]
+
+        with Timer("objects") as slow_timer:
+            objects = Matrix(dims=DIMS, zeros=lambda: None)  # A CALLABLE zeros KEEPS THE NESTED LISTS
+            for c, v in cells:
+                objects[c] = v
+            expected = [v for c, v in objects]
+        with Timer("typed") as fast_timer:
+            typed = Matrix(dims=DIMS, zeros=None)
+            for c, v in cells:
+                typed[c] = v
+            result = [v for c, v in typed]
+
+        self.assertEqual(result, expected)
+        self.assertEqual(typed.aggregate("max"), objects.aggregate("max"))
+
+        num = len(cells)
+        Log.note(
+            "fill and format {{num}} cells: objects {{slow|comma}} cells/sec, typed {{fast|comma}} cells/sec ({{speedup|round(places=1)}}x)",
+            num=num,
+            slow=int(num / slow_timer.duration.seconds),
+            fast=int(num / fast_timer.duration.seconds),
+            speedup=slow_timer.duration.seconds / fast_timer.duration.seconds
+        )
+        Log.note(
+            "memory: objects {{slow|comma}} bytes, typed {{fast|comma}} bytes",
+            slow=_sizeof(objects.cube),
+            fast=typed._values.nbytes + typed._nulls.nbytes
+        )
+
+
+def _sizeof(cube):
+    if isinstance(cube, list):
+        return sys.getsizeof(cube) + sum(_sizeof(c) for c in cube)
+    return 0 if cube is None else sys.getsizeof(cube)
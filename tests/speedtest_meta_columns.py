@@ -0,0 +1,93 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Author: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+
+from __future__ import division
+from __future__ import unicode_literals
+
+from jx_python import jx
+from jx_python.meta import ColumnList, Column, metadata_columns
+from mo_dots import get_attr
+from mo_logs import Log
+from mo_testing.fuzzytestcase import FuzzyTestCase
+from mo_times.timer import Timer
+
+NUM_COLUMNS = 50000
+NUM_QUERIES = 1000
+NUM_SCANS = 10  # THE LINEAR SCAN IS TOO SLOW TO RUN NUM_QUERIES TIMES
+
+
+class TestMetaColumnSpeed(FuzzyTestCase):
+    """
+    MEASURE THE meta.columns ACCESS PATTERNS OVER A LARGE TABLE
+    """
+
+    def setUp(self):
+        self.columns = ColumnList()
+        self.columns.insert(metadata_columns())
+        for i in range(NUM_COLUMNS):
+            self.columns.add(Column(
+                names={".": "a" + str(i % 100) + ".b" + str(i)},
+                es_column="a" + str(i % 100) + ".b" + str(i) + ".$number",
+                es_index="big",
+                type="number",
+                nested_path=["a" + str(i % 100), "."] if i % 2 else ["."]
+            ))
+
+    def test_update_by_column(self):
+        with Timer("linear scan of {{num}} updates", {"num": NUM_SCANS}) as scan:
+            for i in range(NUM_SCANS):
+                es_column = "a" + str(i % 100) + ".b" + str(i) + ".$number"
+                eq = {"es_index": "big", "es_column": es_column}
+                found = [c for c in self.columns if all(get_attr(c, k) == v for k, v in eq.items())]
+                self.assertEqual(len(found), 1)
+
+        with Timer("indexed {{num}} updates", {"num": NUM_QUERIES}) as indexed:
+            for i in range(NUM_QUERIES):
+                es_column = "a" + str(i % 100) + ".b" + str(i) + ".$number"
+                self.columns.update({
+                    "set": {"cardinality": i},
+                    "where": {"eq": {"es_index": "big", "es_column": es_column}}
+                })
+
+        for i in range(NUM_QUERIES):
+            es_column = "a" + str(i % 100) + ".b" + str(i) + ".$number"
+            self.assertEqual(self.columns.find_column("big", es_column, "number")[0].cardinality, i)
+        Log.note(
+            "indexed update is {{ratio|round(places=1)}}x faster",
+            ratio=(scan.duration.seconds / NUM_SCANS) / (indexed.duration.seconds / NUM_QUERIES)
+        )
+
+    def test_nested_path_lookup(self):
+        with Timer("nested path lookup"):
+            nested = self.columns.find_nested(["a7", "."])
+        self.assertEqual(len(nested), NUM_COLUMNS // 100)
+        self.assertEqual(len(self.columns.find_nested(".")), NUM_COLUMNS // 2 + 10)
+
+    def test_meta_columns_query(self):
+        with Timer("first denormalized view"):
+            table = self.columns.denormalized()
+
+        with Timer("{{num}} meta.columns queries", {"num": NUM_QUERIES // 10}):
+            for i in range(NUM_QUERIES // 10):
+                self.assertIs(self.columns.denormalized(), table)
+                result = jx.run({
+                    "from": self.columns.denormalized(),
+                    "where": {"eq": {"name": "a" + str(i % 100) + ".b" + str(i)}},
+                    "format": "list"
+                })
+                self.assertEqual(len(result.data), 1)
+
+        self.columns.update({
+            "set": {"cardinality": 42},
+            "where": {"eq": {"es_index": "big", "es_column": "a0.b0.$number"}}
+        })
+        with Timer("denormalized view after change"):
+            table = self.columns.denormalized()
+        self.assertEqual([r["cardinality"] for r in table.data if r["name"] == "a0.b0"], [42])
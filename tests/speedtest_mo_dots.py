@@ -0,0 +1,86 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Author: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+
+from __future__ import division
+from __future__ import unicode_literals
+
+from mo_dots import wrap, unwrap, Data, FlatList, NullType, split_field, listwrap
+from mo_logs import Log
+from mo_testing.fuzzytestcase import FuzzyTestCase
+from mo_times.timer import Timer
+
+NUM_LOOPS = 200000
+
+
+class TestMoDotsSpeed(FuzzyTestCase):
+    """
+    MICRO-BENCHMARKS OF THE mo_dots OPERATIONS ON THE REQUEST PATH
+    """
+
+    def test_wrap(self):
+        doc = {"a": {"b": 1}}
+        data = wrap(doc)
+        flat = FlatList([1, 2])
+        self._time("wrap(dict)", lambda: wrap(doc))
+        self._time("wrap(Data)", lambda: wrap(data))
+        self._time("wrap(text)", lambda: wrap("text"))
+        self._time("wrap(None)", lambda: wrap(None))
+        self._time("unwrap(Data)", lambda: unwrap(data))
+        self._time("unwrap(FlatList)", lambda: unwrap(flat))
+        self._time("unwrap(int)", lambda: unwrap(42))
+        self._time("listwrap(None)", lambda: listwrap(None))
+
+    def test_access(self):
+        data = wrap({"a": {"b": {"c": 1}}, "x": 2, "v": [1, 2]})
+        self._time("Data.attr", lambda: data.x)
+        self._time("Data.attr missing", lambda: data.missing)
+        self._time("Data.attr.attr", lambda: data.a.b)
+        self._time("Data[key]", lambda: data["x"])
+        self._time("Data[path]", lambda: data["a.b.c"])
+        self._time("Data[missing path]", lambda: data["a.y.z"])
+        self._time("Data.get(key)", lambda: data.get("x"))
+        self._time("split_field(path)", lambda: split_field("a.b.c"))
+
+        def set_path():
+            data["a.b.d"] = 3
+        self._time("Data[path] = value", set_path)
+
+    def test_semantics(self):
+        data = wrap({"a": {"b": {"c": 1}}, "x": 2, "n": None, "e": [], "d": {}, "l": [{"k": 1}, {"k": 2}], "a.b": 3})
+        self.assertIsInstance(data.n, NullType)
+        self.assertEqual(data.n, None)
+        self.assertEqual(data["a.b.c"], 1)
+        self.assertEqual(data["a\\.b"], 3)
+        self.assertEqual(data["l.k"], [1, 2])
+        self.assertEqual(data["a.y.z"], None)
+        self.assertIsInstance(data.a, Data)
+        self.assertIsInstance(data.e, FlatList)
+        self.assertIsInstance(data.d, Data)
+        self.assertIs(wrap(data), data)
+        self.assertEqual(split_field("a\\.b.c"), ["a.b", "c"])
+        self.assertEqual(split_field("..a"), [-1, "a"])
+        self.assertEqual(split_field("."), [])
+        self.assertEqual(split_field(1), [1])
+
+        data["p.q"] = 4
+        self.assertEqual(unwrap(data)["p"], {"q": 4})
+        data.missing.deep = 5
+        self.assertEqual(data.missing.deep, 5)
+
+    def _time(self, name, func):
+        for _ in range(1000):  # WARM UP
+            func()
+        best = None
+        for _ in range(3):  # BEST OF THREE, TO IGNORE OTHER WORK ON THE MACHINE
+            with Timer(name, silent=True) as timer:
+                for _ in xrange(NUM_LOOPS):
+                    func()
+            best = min(best or timer.duration.seconds, timer.duration.seconds)
+        Log.note("{{name|left(24)}} {{rate|comma}} ops/sec", name=name, rate=int(NUM_LOOPS / best))
@@ -0,0 +1,32 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Author: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+
+from __future__ import division
+from __future__ import unicode_literals
+
+import mo_json_config
+from mo_logs import Log
+from mo_testing.fuzzytestcase import FuzzyTestCase
+from tests.replay import run, report
+
+SETTINGS = "tests/config/replay_settings.json"
+
+
+class TestReplaySpeed(FuzzyTestCase):
+    """
+    THE SAMPLE QUERIES, THROUGH THE PYTHON LAYERS, AGAINST THE ES STUB; NO SLOWER THAN THE
+    BASELINE OF THIS MACHINE (THE FIRST RUN WRITES THE BASELINE)
+    """
+
+    def test_sample_queries(self):
+        config = mo_json_config.get("file://" + SETTINGS)
+        summary, regressions = run(config)
+        Log.note("{{num}} runs\n{{report}}", num=summary.runs, report=report(summary))
+        self.assertEqual(regressions, [])
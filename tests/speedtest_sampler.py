@@ -0,0 +1,90 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Author: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+
+from __future__ import division
+from __future__ import unicode_literals
+
+import threading
+from time import time
+
+from mo_json import json2value, value2json
+from mo_logs import Log
+from mo_logs.profiles import SamplingProfiler
+from mo_testing.fuzzytestcase import FuzzyTestCase
+
+NUM_THREADS = 8  # SAME AS THE gunicorn threads PER WORKER
+NUM_REQUESTS = 400  # PER THREAD
+INTERVAL = 0.01
+
+
+class TestSamplerSpeed(FuzzyTestCase):
+    """
+    LOAD TEST: MANY THREADS SERVING FAKE REQUESTS, WITH AND WITHOUT SAMPLING
+    """
+
+    def test_overhead(self):
+        baseline = _load(None)
+
+        production = SamplingProfiler(interval=INTERVAL, rate=0.01)
+        production.start()
+        try:
+            one_percent = _load(production)
+        finally:
+            production.stop()
+
+        everything = SamplingProfiler(interval=INTERVAL, rate=1)
+        everything.start()
+        try:
+            all_requests = _load(everything)
+        finally:
+            everything.stop()
+
+        stacks = everything.collapsed()
+        self.assertGreater(sum(stacks.values()), 0)
+        for stack in stacks.keys():
+            self.assertTrue(stack.startswith("request;"))
+        self.assertTrue(any("speedtest_sampler.py:_request" in s for s in stacks.keys()))
+
+        Log.note(
+            "{{num}} requests: {{baseline|round(places=3)}}sec unprofiled, {{one|round(places=3)}}sec at 1% sampling (+{{one_overhead|percent(digits=2)}}), {{all|round(places=3)}}sec at 100% sampling (+{{all_overhead|percent(digits=2)}})",
+            num=NUM_THREADS * NUM_REQUESTS,
+            baseline=baseline,
+            one=one_percent,
+            one_overhead=max(0, one_percent / baseline - 1),
+            all=all_requests,
+            all_overhead=max(0, all_requests / baseline - 1)
+        )
+
+
+def _load(profiler):
+    """
+    :return: SECONDS FOR NUM_THREADS THREADS TO EACH SERVE NUM_REQUESTS
+    """
+    def serve():
+        for _ in range(NUM_REQUESTS):
+            if profiler:
+                with profiler.endpoint("request"):
+                    _request()
+            else:
+                _request()
+
+    threads = [threading.Thread(target=serve) for _ in range(NUM_THREADS)]
+    start = time()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time() - start
+
+
+def _request():
+    # ROUGHLY THE SHAPE OF A SMALL QUERY: DECODE, WORK ON THE DATA, ENCODE
+    data = json2value(value2json([{"a": i, "b": {"c": str(i)}} for i in range(50)]))
+    return value2json([d for d in data if d.a % 2])
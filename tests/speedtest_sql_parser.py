@@ -0,0 +1,57 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Author: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+
+from __future__ import division
+from __future__ import unicode_literals
+
+import moz_sql_parser
+from moz_sql_parser import fast_parser, _scrub
+from moz_sql_parser.sql_parser import SQLParser
+from mo_logs import Log
+from mo_testing.fuzzytestcase import FuzzyTestCase
+from mo_times.timer import Timer
+from tests.test_sql_parser import TEST_SQL, SUPPORTED
+
+NUM_REPEATS = 3
+
+
+class TestSQLParserSpeed(FuzzyTestCase):
+    """
+    PARSE THE SAME STATEMENTS WITH THE pyparsing GRAMMAR, THE HAND-WRITTEN
+    PARSER, AND THROUGH THE CACHE
+    """
+
+    def test_parse(self):
+        statements = TEST_SQL + SUPPORTED
+
+        with Timer("pyparsing") as slow_timer:
+            for _ in range(NUM_REPEATS):
+                expected = [_scrub(SQLParser.parseString(sql, parseAll=True)) for sql in statements]
+
+        with Timer("fast") as fast_timer:
+            for _ in range(NUM_REPEATS):
+                result = [_scrub(fast_parser.parse(sql)) for sql in statements]
+        self.assertEqual(result, expected)
+
+        moz_sql_parser._cache.clear()
+        with Timer("cached") as cached_timer:
+            for _ in range(NUM_REPEATS):
+                result = [moz_sql_parser.parse(sql) for sql in statements]
+        self.assertEqual(result, expected)
+
+        num = NUM_REPEATS * len(statements)
+        Log.note(
+            "{{num}} statements: pyparsing {{slow|comma}}/sec, hand-written {{fast|comma}}/sec ({{speedup|round(places=1)}}x), cached {{cached|comma}}/sec",
+            num=num,
+            slow=int(num / slow_timer.duration.seconds),
+            fast=int(num / fast_timer.duration.seconds),
+            cached=int(num / cached_timer.duration.seconds),
+            speedup=slow_timer.duration.seconds / fast_timer.duration.seconds
+        )
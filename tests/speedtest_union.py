@@ -0,0 +1,78 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Author: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+
+from __future__ import division
+from __future__ import unicode_literals
+
+from mo_logs import Log
+from mo_times.timer import Timer
+from pyLibrary import convert
+from tests.test_jx import BaseTestCase
+
+NUM_DOCS = 100000
+NUM_VALUES = 50000
+NUM_REPEAT = 5
+
+# WHAT union USED TO SEND
+SCRIPTED_UNION = {"scripted_metric": {
+    'init_script': 'params._agg.terms = new HashSet()',
+    'map_script': 'for (v in doc["v"].values) params._agg.terms.add(v)',
+    'combine_script': 'return params._agg.terms.toArray()',
+    'reduce_script': 'HashSet output = new HashSet(); for (a in params._aggs) { if (a!=null) for (v in a) {output.add(v)} } return output.toArray()',
+}}
+
+# WHAT union SENDS NOW
+TERMS_UNION = {"terms": {"field": "v", "size": NUM_VALUES}}
+
+
+class TestUnionSpeed(BaseTestCase):
+    """
+    union OVER A HIGH-CARDINALITY COLUMN, ON A LOCAL ES
+    """
+
+    def test_union(self):
+        settings = self.utils.fill_container(
+            {
+                "data": [{"v": i % NUM_VALUES} for i in range(NUM_DOCS)],
+                "query": {"from": ""}  # DUMMY LINE
+            },
+            tjson=False
+        )
+        cluster = self.utils._es_cluster
+        path = "/" + settings.index + "/_search"
+
+        def search(agg):
+            return cluster.post(path, data={"size": 0, "aggs": {"u": agg}})
+
+        with Timer("scripted_metric union") as scripted:
+            for _ in range(NUM_REPEAT):
+                scripted_result = search(SCRIPTED_UNION)
+        with Timer("terms union") as terms:
+            for _ in range(NUM_REPEAT):
+                terms_result = search(TERMS_UNION)
+
+        expected = set(scripted_result.aggregations.u.value)
+        self.assertEqual(len(expected), NUM_VALUES)
+        self.assertEqual(set(b.key for b in terms_result.aggregations.u.buckets), expected)
+
+        Log.note(
+            "union of {{num}} values: scripted_metric {{scripted|round(places=3)}}sec, terms {{terms|round(places=3)}}sec",
+            num=NUM_VALUES,
+            scripted=scripted.duration.seconds / NUM_REPEAT,
+            terms=terms.duration.seconds / NUM_REPEAT
+        )
+
+        # THE SAME, THROUGH THE SERVICE
+        query = {"from": settings.index, "select": {"value": "v", "aggregate": "union", "limit": NUM_VALUES}, "format": "list"}
+        with Timer("union through service"):
+            response = self.utils.try_till_response(self.utils.service_url, data=convert.unicode2utf8(convert.value2json(query)))
+        self.assertEqual(response.status_code, 200)
+        result = convert.json2value(convert.utf82unicode(response.all_content))
+        self.assertEqual(set(result.data.v), expected)
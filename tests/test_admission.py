@@ -0,0 +1,203 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Author: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+
+from __future__ import division
+from __future__ import unicode_literals
+
+from active_data.admission import Admission, QUERY_TOO_BUSY
+from jx_base.expressions import jx_expression
+from jx_base.query import QueryOp
+from jx_base.schema import Schema
+from jx_elasticsearch.es52.cost import estimate_cost, BUCKET_WEIGHT, ROW_WEIGHT, RETENTION
+from jx_python.meta import Column
+from mo_dots import Data
+from mo_logs import Except
+from mo_testing.fuzzytestcase import FuzzyTestCase
+
+SETTINGS = {"max_cost": 100, "expensive": 50, "max_expensive": 1, "max_queue": 3, "max_wait": 10}
+
+
+class TestAdmission(FuzzyTestCase):
+
+    def test_cheap_go_around_expensive(self):
+        result = simulate([
+            # (ARRIVAL, NAME, COST, DURATION)
+            (0, "big1", 60, 20),
+            (1, "big2", 60, 20),
+            (2, "small1", 10, 1),
+            (3, "small2", 10, 1)
+        ])
+        self.assertEqual(result, {
+            "big1": (0, 20),
+            "big2": (20, 40),  # WAITED FOR THE ONLY EXPENSIVE SLOT
+            "small1": (2, 3),
+            "small2": (3, 4)
+        })
+
+    def test_cheapest_first(self):
+        result = simulate([
+            (0, "fill", 45, 10),
+            (0, "fill2", 45, 10),
+            (1, "medium", 40, 1),
+            (2, "small", 20, 1),
+            (3, "tiny", 5, 1)
+        ])
+        self.assertEqual(result, {
+            "fill": (0, 10),
+            "fill2": (0, 10),
+            "tiny": (3, 4),  # FITS IN THE REMAINING BUDGET
+            "small": (10, 11),  # CHEAPER THAN medium, SO ADMITTED FIRST
+            "medium": (10, 11)
+        })
+
+    def test_rejections(self):
+        result = simulate([
+            (0, "huge", 1000, 1),
+            (0, "big", 60, 30),
+            (1, "wait1", 55, 1),
+            (2, "wait2", 55, 1),
+            (3, "wait3", 55, 1),
+            (4, "overflow", 55, 1),
+            (20, "late", 10, 1)
+        ])
+        self.assertEqual(result, {
+            "huge": "rejected",  # TOO EXPENSIVE TO EVER RUN
+            "big": (0, 30),
+            "wait1": "rejected",  # WAITED MORE THAN max_wait
+            "wait2": "rejected",
+            "wait3": "rejected",
+            "overflow": "rejected",  # QUEUE WAS FULL
+            "late": (20, 21)
+        })
+
+    def test_clusters_are_independent(self):
+        admission = Admission(SETTINGS)
+        a = admission.request("a", 60, 0)
+        b = admission.request("b", 60, 0)
+        a2 = admission.request("a", 60, 0)
+        self.assertEqual((a.state, b.state, a2.state), ("running", "running", "waiting"))
+        self.assertEqual(admission.release(a, 1), [a2])
+
+    def test_enter(self):
+        admission = Admission(SETTINGS)
+        with admission.enter("a", 10) as ticket:
+            self.assertEqual(ticket.state, "running")
+        self.assertEqual(ticket.state, "done")
+        try:
+            admission.enter("a", 1000)
+            self.assertTrue(False, "expecting rejection")
+        except Exception as e:
+            self.assertTrue(QUERY_TOO_BUSY in Except.wrap(e))
+
+    def test_enter_batch(self):
+        admission = Admission(SETTINGS)
+        big1, big2, small, huge = admission.enter_batch([("a", 60), ("a", 60), ("a", 10), ("a", 1000)])
+        self.assertEqual((big1.state, big2.state, small.state), ("running", "waiting", "running"))
+        self.assertTrue(QUERY_TOO_BUSY in huge)  # ONLY THE ONE QUERY IS REJECTED
+
+        big1.release()
+        small.release()
+        self.assertEqual(admission.wait_any([big2]), [])
+        self.assertEqual(big2.state, "running")
+        big2.release()
+
+    def test_wait_any_too_long(self):
+        admission = Admission(dict(SETTINGS, max_wait=0.5))
+        big1, big2 = admission.enter_batch([("a", 60), ("a", 60)])
+        self.assertEqual(admission.wait_any([big1, big2]), [big2])
+        self.assertEqual(big2.state, "done")
+        big1.release()
+        self.assertEqual(admission.lanes["a"].running_cost, 0)
+
+
+class TestCostEstimate(FuzzyTestCase):
+
+    def test_setop(self):
+        query = _query({"from": "test", "select": ["a", "b"], "limit": 10})
+        estimate = estimate_cost(query)
+        self.assertEqual(estimate, {"docs": 1000, "rows": 10, "cost": 1000 + 10 * 2 * ROW_WEIGHT})
+
+    def test_edges(self):
+        query = _query({
+            "from": "test",
+            "edges": ["a", {"value": "b", "allowNulls": False}],
+            "select": {"aggregate": "count"}
+        })
+        estimate = estimate_cost(query)
+        # a HAS 5 VALUES (AND null), b HAS 20 VALUES
+        self.assertEqual(estimate, {"docs": 1000, "buckets": 6 * 20, "cost": 1000 + 6 * 20 * BUCKET_WEIGHT})
+
+    def test_time_range(self):
+        now = 1500000000
+        query = _query({
+            "from": "test",
+            "select": {"aggregate": "count"},
+            "where": {"and": [
+                {"gte": {"t": {"date": "2017-07-04"}}},
+                {"lt": {"t": {"date": "2017-07-13"}}}
+            ]}
+        })
+        estimate = estimate_cost(query, now=now)
+        self.assertAlmostEqual(estimate.docs, 1000 * (9 * 24 * 60 * 60) / RETENTION)
+
+
+def simulate(arrivals):
+    """
+    RUN THE SCHEDULER ON A SIMULATED CLOCK
+    :param arrivals: LIST OF (ARRIVAL, NAME, COST, DURATION)
+    :return: MAP FROM NAME TO (START, END), OR "rejected"
+    """
+    admission = Admission(SETTINGS)
+    output = {}
+    tickets = {}  # MAP FROM id(ticket) TO (NAME, DURATION)
+    finishes = []  # LIST OF (TIME, ticket)
+
+    def started(now, admitted):
+        for t in admitted:
+            name, duration = tickets[id(t)]
+            output[name] = (now, now + duration)
+            finishes.append((now + duration, t))
+
+    pending = sorted(arrivals)
+    while pending or finishes:
+        finishes.sort(key=lambda f: f[0])
+        if finishes and (not pending or finishes[0][0] <= pending[0][0]):
+            now, ticket = finishes.pop(0)
+            started(now, admission.release(ticket, now))
+            continue
+
+        now, name, cost, duration = pending.pop(0)
+        for t in admission.expire(now):
+            output[tickets[id(t)][0]] = "rejected"
+        try:
+            ticket = admission.request("es", cost, now)
+        except Exception:
+            output[name] = "rejected"
+            continue
+        tickets[id(ticket)] = (name, duration)
+        if ticket.state == "running":
+            started(now, [ticket])
+
+    # WHATEVER IS STILL WAITING, WAITS FOREVER
+    for t in admission.expire(float("inf")):
+        output[tickets[id(t)][0]] = "rejected"
+    return output
+
+
+def _query(query):
+    frum = Data(name="test")
+    frum.schema = Schema("test", [
+        Column(names={".": "a"}, es_column="a", es_index="test", type="string", nested_path=["."], count=1000, cardinality=5),
+        Column(names={".": "b"}, es_column="b", es_index="test", type="string", nested_path=["."], count=800, cardinality=20),
+        Column(names={".": "t"}, es_column="t", es_index="test", type="number", nested_path=["."], count=1000, cardinality=900)
+    ])
+    output = QueryOp.wrap(query, schema=frum.schema)
+    output.frum = frum
+    return output
@@ -80,6 +80,37 @@ class TestBasicRequests(BaseTestCase):
         except Exception:
             self.assertEqual(response.all_content, expected2)
 
+    def test_batch_request(self):
+        settings = self.utils.fill_container({
+            "data": [
+                {"a": 0, "b": 0},
+                {"a": 0, "b": 1},
+                {"a": 1, "b": 0},
+                {"a": 1, "b": 1}
+            ],
+            "query": {"from": ""}  # DUMMY LINE
+        })
+
+        url = URL(self.utils.service_url)
+        url.path = "query/batch"
+
+        queries = [
+            {"meta": {"testing": True}, "from": settings.index, "select": {"aggregate": "count"}, "format": "list"},
+            {"from": settings.index, "where": {"eq": {"a": 1}}, "sort": "b", "format": "list"},
+            {"from": settings.index, "select": {"value": "a", "aggregate": "not_an_aggregate"}},
+            {"from": settings.index, "edges": ["a"], "format": "table"}
+        ]
+        response = self.utils.try_till_response(str(url), data=convert.unicode2utf8(convert.value2json(queries)))
+        self.assertEqual(response.status_code, 200)
+
+        results = convert.json2value(convert.utf82unicode(response.all_content))
+        self.assertEqual(len(results), 4)
+        self.assertEqual(results[0].data, {"count": 4})
+        self.assertEqual(results[1].data, [{"a": 1, "b": 0}, {"a": 1, "b": 1}])
+        self.assertEqual(results[2].type, "ERROR")
+        self.assertEqual(results[3].header, ["a", "count"])
+        self.assertEqual(results[3].data, [[0, 2], [1, 2], [None, 0]])
+
     def test_index_wo_name(self):
         data = {
             "name": "The Parent Trap",
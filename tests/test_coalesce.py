@@ -0,0 +1,198 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Author: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+
+from __future__ import division
+from __future__ import unicode_literals
+
+import hashlib
+import os
+import subprocess
+from tempfile import mkdtemp
+from time import time
+
+from active_data.coalesce import Coalescer, EMPTY_MARKER
+from mo_files import File
+from mo_future import text_type
+from mo_logs import Except
+from mo_testing.fuzzytestcase import FuzzyTestCase
+from mo_threads import Lock, Thread, Till
+from pyLibrary.env.elasticsearch import DEADLINE_EXCEEDED
+
+QUERY_TIME = 0.5  # SECONDS THE SLOW QUERY TAKES
+
+
+class TestCoalesce(FuzzyTestCase):
+
+    def setUp(self):
+        self.directory = File(mkdtemp())
+
+    def tearDown(self):
+        self.directory.delete()
+
+    def test_followers_share_response(self):
+        coalescer = Coalescer()
+        query = SlowQuery()
+        responses = _concurrent(10, lambda: coalescer.run("same", query, timeout=30))
+
+        self.assertEqual(query.calls, 1)
+        self.assertEqual(set(r for r, _ in responses), {("application/json", b"[1, 2, 3]")})
+        self.assertEqual(sorted(c for _, c in responses), [False] + [True] * 9)
+        self.assertEqual(coalescer.leaders, 1)
+        self.assertEqual(coalescer.followers, 9)
+
+    def test_different_keys(self):
+        coalescer = Coalescer()
+        query = SlowQuery()
+        _concurrent(4, lambda: coalescer.run(query.next_key(), query, timeout=30))
+        self.assertEqual(query.calls, 4)
+        self.assertEqual(coalescer.followers, 0)
+
+    def test_leader_failure_is_not_shared(self):
+        coalescer = Coalescer()
+        query = SlowQuery(fail_first=True)
+        responses = _concurrent(5, lambda: coalescer.run("same", query, timeout=30))
+
+        self.assertEqual(query.calls, 2)
+        self.assertEqual(len([r for r in responses if isinstance(r, Exception)]), 1)
+        self.assertEqual(len([r for r in responses if isinstance(r, tuple) and r[1]]), 3)
+
+    def test_follower_deadline(self):
+        coalescer = Coalescer()
+        query = SlowQuery()
+        Thread.run("leader", lambda please_stop: coalescer.run("same", query, timeout=30))
+        Till(seconds=QUERY_TIME / 5).wait()
+        try:
+            coalescer.run("same", query, timeout=QUERY_TIME / 5)
+            self.assertTrue(False, "expecting deadline")
+        except Exception as e:
+            self.assertTrue(DEADLINE_EXCEEDED in Except.wrap(e))
+
+    def test_across_workers(self):
+        # TWO Coalescers SHARING A DIRECTORY BEHAVE LIKE TWO WORKERS
+        worker1 = Coalescer(directory=self.directory.abspath)
+        worker2 = Coalescer(directory=self.directory.abspath)
+        query = SlowQuery()
+
+        leader = Thread.run("worker1", lambda please_stop: worker1.run("same", query, timeout=30))
+        Till(seconds=QUERY_TIME / 5).wait()
+        response, coalesced = worker2.run("same", query, timeout=30)
+        leader.join()
+        worker1.stop()
+
+        self.assertEqual(query.calls, 1)
+        self.assertEqual(response, ("application/json", b"[1, 2, 3]"))
+        self.assertTrue(coalesced)
+
+        # LATER, THE SAME QUERY RUNS AGAIN
+        response, coalesced = worker2.run("same", query, timeout=30)
+        worker2.stop()
+        self.assertEqual(query.calls, 2)
+        self.assertFalse(coalesced)
+
+    def test_no_files_without_followers(self):
+        worker = Coalescer(directory=self.directory.abspath)
+        worker.stop()
+        response, coalesced = worker.run("same", SlowQuery(), timeout=30)
+        self.assertFalse(coalesced)
+        self.assertEqual(list(self.directory.children), [])  # NOBODY WAITED, SO NOTHING WAS WRITTEN
+
+    def test_dead_leader(self):
+        worker = Coalescer(directory=self.directory.abspath)
+        worker.stop()
+        key = hashlib.sha1(b"same").hexdigest()
+        File.new_instance(self.directory, key + ".running").write(text_type(_dead_pid()))
+
+        query = SlowQuery()
+        response, coalesced = worker.run("same", query, timeout=30)
+        self.assertEqual(query.calls, 1)
+        self.assertFalse(coalesced)
+
+    def test_clean(self):
+        worker = Coalescer(directory=self.directory.abspath, keep=0)
+        worker.stop()
+        File.new_instance(self.directory, "a.running").write(text_type(_dead_pid()))
+        File.new_instance(self.directory, "b.running").write(text_type(os.getpid()))
+        _empty_marker(File.new_instance(self.directory, "d.running"), age=EMPTY_MARKER + 1)
+        _empty_marker(File.new_instance(self.directory, "e.running"), age=0)
+        File.new_instance(self.directory, "b.wanted").write("")
+        File.new_instance(self.directory, "c.response").write("")
+        worker.clean()
+        # ONLY THE LIVE, AND THE JUST-CREATED, running MARKERS ARE KEPT
+        self.assertEqual(sorted(f.name for f in self.directory.children), ["b", "e"])
+
+    def test_empty_marker(self):
+        worker = Coalescer(directory=self.directory.abspath)
+        worker.stop()
+        key = hashlib.sha1(b"same").hexdigest()
+        _empty_marker(File.new_instance(self.directory, key + ".running"), age=EMPTY_MARKER + 1)
+
+        query = SlowQuery()
+        response, coalesced = worker.run("same", query, timeout=EMPTY_MARKER)
+        self.assertEqual(query.calls, 1)
+        self.assertFalse(coalesced)
+
+
+class SlowQuery(object):
+
+    def __init__(self, fail_first=False):
+        self.locker = Lock()
+        self.calls = 0
+        self.keys = 0
+        self.fail_first = fail_first
+
+    def __call__(self):
+        with self.locker:
+            self.calls += 1
+            call = self.calls
+        Till(seconds=QUERY_TIME).wait()
+        if self.fail_first and call == 1:
+            raise Exception("leader failed")
+        return "application/json", b"[1, 2, 3]"
+
+    def next_key(self):
+        with self.locker:
+            self.keys += 1
+            return "key" + str(self.keys)
+
+
+def _dead_pid():
+    """
+    :return: THE PID OF A PROCESS THAT HAS EXITED
+    """
+    process = subprocess.Popen(["true"])
+    process.wait()
+    return process.pid
+
+
+def _empty_marker(file, age):
+    """
+    THE running MARKER OF A WORKER THAT DIED BEFORE WRITING ITS PID, age SECONDS AGO
+    """
+    file.write("")
+    then = time() - age
+    os.utime(file.abspath, (then, then))
+
+
+def _concurrent(num, function):
+    """
+    :return: LIST OF num RESPONSES (OR EXCEPTIONS) FROM function, ALL CALLED AT ONCE
+    """
+    responses = []
+
+    def run(please_stop):
+        try:
+            responses.append(function())
+        except Exception as e:
+            responses.append(e)
+
+    threads = [Thread.run("request " + str(i), run) for i in range(num)]
+    for t in threads:
+        t.join()
+    return responses
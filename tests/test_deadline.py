@@ -0,0 +1,185 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Author: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+
+from __future__ import division
+from __future__ import unicode_literals
+
+import time
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from SocketServer import ThreadingMixIn
+from urlparse import urlparse, parse_qs
+
+from mo_dots import Data
+from mo_json import value2json
+from mo_logs import Except
+from mo_testing.fuzzytestcase import FuzzyTestCase
+from mo_threads import Thread, Till
+from pyLibrary.env.elasticsearch import Cluster, Deadline, DEADLINE_EXCEEDED
+
+SEARCH_DELAY = 2  # SECONDS THE STUB TAKES TO ANSWER A SEARCH
+
+
+class TestDeadline(FuzzyTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = StubServer(("localhost", 0), StubES)
+        Thread.run("stub es", lambda please_stop: cls.server.serve_forever())
+        cls.cluster = Cluster(host="http://localhost", port=cls.server.server_address[1])
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+
+    def setUp(self):
+        del requests[:]
+
+    def test_deadline_cancels(self):
+        try:
+            with Deadline(seconds=0.5) as deadline:
+                self.cluster.post("/test/test/_search", data={"size": 0})
+            self.assertTrue(False, "expecting timeout")
+        except Exception:
+            pass
+
+        search = [r for r in requests if r.path.endswith("/_search")][0]
+        self.assertEqual(search.opaque_id, deadline.opaque_id)
+        self.assertTrue(search.params["timeout"].endswith("ms"))
+        self.assertLessEqual(int(search.params["timeout"][:-2]), 500)
+
+        # ONLY THE PARENT TASK IS CANCELLED
+        self.assertEqual([r.path for r in requests if r.path.endswith("/_cancel")], ["/_tasks/stub:1/_cancel"])
+
+    def test_cancel_from_another_thread(self):
+        deadline = Deadline(seconds=30)
+
+        def cancel(please_stop):
+            Till(seconds=0.5).wait()
+            deadline.cancel()
+
+        Thread.run("cancel", cancel)
+        with deadline:
+            self.cluster.post("/test/test/_search", data={"size": 0})
+        self.assertEqual([r.path for r in requests if r.path.endswith("/_cancel")], ["/_tasks/stub:1/_cancel"])
+
+        # NO MORE REQUESTS ARE ALLOWED
+        try:
+            with deadline:
+                self.cluster.post("/test/test/_search", data={"size": 0})
+            self.assertTrue(False, "expecting refusal")
+        except Exception as e:
+            self.assertTrue(DEADLINE_EXCEEDED in Except.wrap(e))
+
+    def test_no_cancel_when_answered(self):
+        try:
+            with Deadline(seconds=30) as deadline:
+                self.cluster.post("/test/test/_search?fast", data={"size": 0})
+                raise Exception("problem after ES responded")
+        except Exception:
+            pass
+        self.assertEqual([r.path for r in requests if r.path.startswith("/_tasks")], [])
+        self.assertGreater(deadline.round_trip, 0)
+        self.assertGreater(deadline.decode, 0)
+
+    def test_msearch_shard_failure(self):
+        index = Data(path="/test/test")
+        responses = self.cluster.msearch([(index, {"size": 0}), (index, {"size": 0, "fail": True})])
+        self.assertEqual(responses[0].error, None)
+        self.assertEqual(responses[1].error, "Shard failures: query_shard_exception: No mapping found for [a]")
+
+    def test_bind(self):
+        with Deadline(seconds=30) as deadline:
+            bound = Deadline.bind(Deadline.current)
+        self.assertEqual(Deadline.current(), None)
+        self.assertTrue(bound() is deadline)
+        self.assertEqual(Deadline.current(), None)
+
+
+requests = []  # EVERY REQUEST THE STUB SAW
+
+
+class StubServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class StubES(BaseHTTPRequestHandler):
+    """
+    JUST ENOUGH ES TO ANSWER Cluster(), SLOW SEARCHES, _msearch, AND THE _tasks API
+    """
+
+    def do_GET(self):
+        self._record()
+        if self.path == "/":
+            self._send({"version": {"number": "6.2.4"}})
+        elif self.path.startswith("/_cluster/state"):
+            self._send({"metadata": {"indices": {}}})
+        elif self.path.startswith("/_tasks"):
+            opaque_ids = [r.opaque_id for r in requests if r.opaque_id]
+            self._send({"nodes": {"stub": {"tasks": {
+                "stub:1": {"action": "indices:data/read/search", "headers": {"X-Opaque-Id": opaque_ids[-1]}},
+                "stub:2": {"action": "indices:data/read/search[phase/query]", "parent_task_id": "stub:1", "headers": {"X-Opaque-Id": opaque_ids[-1]}}
+            }}}})
+        else:
+            self._send({"error": "not expected"}, status=404)
+
+    def do_POST(self):
+        request = self._record()
+        if request.path.endswith("/_msearch"):
+            lines = self.rfile.read(int(self.headers.get("content-length", 0))).strip().split("\n")
+            self._send({"responses": [
+                {
+                    "_shards": {"failed": 1, "failures": [{"shard": 0, "index": "test", "reason": {"type": "query_shard_exception", "reason": "No mapping found for [a]"}}]},
+                    "timed_out": False
+                } if "fail" in body else {
+                    "_shards": {"failed": 0},
+                    "timed_out": False,
+                    "hits": {"total": 0, "hits": []}
+                }
+                for body in lines[1::2]
+            ]})
+            return
+        self.rfile.read(int(self.headers.get("content-length", 0)))
+        if request.path.endswith("/_search"):
+            if "fast" not in request.params:
+                time.sleep(SEARCH_DELAY)
+            self._send({"_shards": {"failed": 0}, "timed_out": False, "hits": {"total": 0, "hits": []}})
+        elif request.path.endswith("/_cancel"):
+            self._send({"nodes": {}})
+        else:
+            self._send({"error": "not expected"}, status=404)
+
+    def _record(self):
+        url = urlparse(self.path)
+        request = Request(url.path, {k: v[0] for k, v in parse_qs(url.query, keep_blank_values=True).items()}, self.headers.get("X-Opaque-Id"))
+        requests.append(request)
+        return request
+
+    def _send(self, data, status=200):
+        content = value2json(data).encode("utf8")
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+        except Exception:
+            pass  # CLIENT GAVE UP
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Request(object):
+    __slots__ = ["path", "params", "opaque_id"]
+
+    def __init__(self, path, params, opaque_id):
+        self.path = path
+        self.params = params
+        self.opaque_id = opaque_id
@@ -0,0 +1,149 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Author: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+
+from __future__ import division
+from __future__ import unicode_literals
+
+from random import Random
+
+from jx_base.expressions import jx_expression
+from jx_python import jx
+from jx_python.containers.doc_store import DocStore
+from mo_dots import unwrap
+from mo_testing.fuzzytestcase import FuzzyTestCase
+
+NUM_ROWS = 2000
+
+WHERES = [
+    {"eq": {"status": "ok"}},
+    {"eq": {"code": 200}},
+    {"ne": {"code": 200}},
+    {"gt": {"duration": 0.5}},
+    {"lte": {"code": 404}},
+    {"in": {"status": ["error", "timeout"]}},
+    {"prefix": {"url.path": "/query"}},
+    {"regex": {"url.path": ".*/tasks.*"}},
+    {"missing": "user"},
+    {"exists": "user"},
+    {"and": [{"eq": {"status": "ok"}}, {"not": {"eq": {"code": 200}}}]},
+    {"or": [{"eq": {"status": "timeout"}}, {"gte": {"duration": 0.9}}]},
+    {"eq": [{"add": ["code", 1]}, 201]}  # NOT A COLUMN, EVALUATED ONE ROW AT A TIME
+]
+
+
+class TestDocStore(FuzzyTestCase):
+
+    def test_where(self):
+        data = _data()
+        store = DocStore("requests", data)
+        for where in WHERES:
+            result = store.query({"from": store, "where": where, "select": "i", "limit": NUM_ROWS, "format": "list"})
+            expected = [d["i"] for d in jx.filter(data, jx_expression(where))]
+            self.assertEqual(unwrap(result.data), expected, "where " + jx_expression(where).to_python())
+
+    def test_sort(self):
+        data = _data()
+        store = DocStore("requests", data)
+        for sort in [["status", "i"], [{"duration": "desc"}], [{"user": "desc"}, "code", {"i": "desc"}]]:
+            result = store.query({"from": store, "sort": sort, "select": "i", "limit": NUM_ROWS, "format": "list"})
+            expected = [d["i"] for d in jx.sort(data, sort)]
+            self.assertEqual(unwrap(result.data), expected)
+
+    def test_groupby(self):
+        data = _data()
+        store = DocStore("requests", data)
+        result = store.query({
+            "from": store,
+            "groupby": ["status", "code"],
+            "select": [
+                {"aggregate": "count"},
+                {"name": "users", "value": "user", "aggregate": "count"},
+                {"name": "total", "value": "duration", "aggregate": "sum"},
+                {"name": "slowest", "value": "duration", "aggregate": "max"},
+                {"name": "fastest", "value": "duration", "aggregate": "min"},
+                {"name": "mean", "value": "duration", "aggregate": "average"},
+                {"name": "distinct", "value": "user", "aggregate": "cardinality"}
+            ],
+            "limit": NUM_ROWS,
+            "format": "list"
+        })
+
+        expected = []
+        for key, group in jx.groupby(data, ["status", "code"], sort_keys=True):
+            group = unwrap(group)
+            durations = [g["duration"] for g in group]
+            users = [g["user"] for g in group if g.get("user") is not None]
+            expected.append({
+                "status": key["status"],
+                "code": key["code"],
+                "count": len(group),
+                "users": len(users),
+                "total": sum(durations),
+                "slowest": max(durations),
+                "fastest": min(durations),
+                "mean": sum(durations) / len(durations),
+                "distinct": len(set(users))
+            })
+        self.assertAlmostEqual(unwrap(result.data), expected, places=6)
+
+    def test_types(self):
+        store = DocStore("types")
+        store.extend([{"a": 1}, {"a": True}])
+        self.assertEqual(store._columns["a"].type, "integer")
+        store.add({"a": 2.5})
+        self.assertEqual(store._columns["a"].type, "double")
+        store.add({"a": "text"})
+        self.assertEqual(store._columns["a"].type, "object")
+        self.assertEqual([d["a"] for d in store.data], [1, 1, 2.5, "text"])
+
+    def test_uid(self):
+        store = DocStore("docs", [{"_id": 1, "v": "a"}, {"_id": 2, "v": "b"}], uid="_id")
+        store.add({"_id": 1, "v": "c"})
+        self.assertEqual(store.data, [{"_id": 2, "v": "b"}, {"_id": 1, "v": "c"}])
+
+        store.update({"set": {"v": "d"}, "where": {"eq": {"_id": 2}}})
+        result = store.query({"from": store, "where": {"eq": {"v": "d"}}, "format": "list"})
+        self.assertEqual(result.data, [{"_id": 2, "v": "d"}])
+
+        store.update({"clear": "v", "where": {"eq": {"_id": 1}}})
+        self.assertEqual(store.data, [{"_id": 2, "v": "d"}, {"_id": 1}])
+
+    def test_column_order(self):
+        store = DocStore("docs", [{"alpha": 1, "zeta": 2, "mid": 3, "a": 4, "z": 5}])
+        result = store.query({"from": store, "select": ["zeta", "alpha", "mid"], "format": "table"})
+        self.assertEqual(result.header, ["zeta", "alpha", "mid"])
+        self.assertEqual(result.data, [[2, 1, 3]])
+
+        result = store.query({
+            "from": store,
+            "groupby": ["alpha"],
+            "select": [{"name": "z", "value": "z", "aggregate": "sum"}, {"name": "a", "value": "a", "aggregate": "sum"}],
+            "format": "table"
+        })
+        self.assertEqual(result.header, ["alpha", "z", "a"])
+        self.assertEqual(result.data, [[1, 5, 4]])
+
+        result = store.query({"from": store, "select": ["zeta", "alpha"], "format": "cube"})
+        self.assertEqual([s["name"] for s in result.select], ["zeta", "alpha"])
+
+
+def _data():
+    rng = Random(42)
+    return [
+        {
+            "i": i,
+            "status": rng.choice(["ok", "ok", "ok", "error", "timeout"]),
+            "code": rng.choice([200, 200, 404, 500]),
+            "duration": rng.random(),
+            "url": {"path": rng.choice(["/query", "/query/sql", "/tasks/1", "/json"])},
+            "user": rng.choice(["alice", "bob", "carol", None])
+        }
+        for i in range(NUM_ROWS)
+    ]
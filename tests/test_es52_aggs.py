@@ -0,0 +1,127 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Author: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+
+from __future__ import division
+from __future__ import unicode_literals
+
+from jx_base.expressions import TRUE, jx_expression
+from jx_base.query import MAX_LIMIT
+from jx_base.schema import Schema
+from jx_elasticsearch.es52.aggs import compile_aggsop
+from jx_elasticsearch.es52.expressions import Variable
+from jx_python.meta import Column
+from mo_dots import Data
+from mo_json.typed_encoder import encode_property
+from mo_testing.fuzzytestcase import FuzzyTestCase
+
+ES_COLUMN = "duration.~n~"
+
+
+class TestES52Aggs(FuzzyTestCase):
+
+    def test_selects_share_aggregates(self):
+        query = _query([
+            Data(name="min", value=Variable("duration"), aggregate="min"),
+            Data(name="max", value=Variable("duration"), aggregate="max"),
+            Data(name="avg", value=Variable("duration"), aggregate="avg"),
+            Data(name="median", value=Variable("duration"), aggregate="median"),
+            Data(name="p90", value=Variable("duration"), aggregate="percentile", percentile=0.9),
+            Data(name="stats", value=Variable("duration"), aggregate="stats")
+        ])
+        es_query, _ = compile_aggsop(_frum(), query)
+
+        self.assertEqual(es_query.aggs, {
+            "duration": {"extended_stats": {"field": ES_COLUMN}},
+            "duration percentile": {"percentiles": {"field": ES_COLUMN, "percents": [50, 90]}}
+        })
+
+        row = {
+            "duration": {"count": 3, "min": 1, "max": 5, "avg": 3, "sum": 9},
+            "duration percentile": {"values": {"50.0": 2, "90.0": 4.5}}
+        }
+        pulled = {s.name: s.pull(row) for s in query.select}
+        self.assertEqual(pulled["min"], 1)
+        self.assertEqual(pulled["max"], 5)
+        self.assertEqual(pulled["avg"], 3)
+        self.assertEqual(pulled["median"], 2)
+        self.assertEqual(pulled["p90"], 4.5)
+        self.assertEqual(pulled["stats"], {"count": 3, "min": 1, "max": 5, "avg": 3, "sum": 9, "median": 2})
+
+    def test_expressions_share_aggregates(self):
+        query = _query([
+            Data(name="min", value=jx_expression({"add": ["duration", 1]}), aggregate="min"),
+            Data(name="max", value=jx_expression({"add": ["duration", 1]}), aggregate="max"),
+            Data(name="median", value=jx_expression({"add": ["duration", 1]}), aggregate="median"),
+            Data(name="p90", value=jx_expression({"add": ["duration", 1]}), aggregate="percentile", percentile=0.9),
+            Data(name="other", value=jx_expression({"add": ["duration", 2]}), aggregate="max")
+        ])
+        es_query, _ = compile_aggsop(_frum(), query)
+
+        self.assertEqual(set(es_query.aggs.keys()), {"min", "median percentile", "other"})
+        self.assertEqual(es_query.aggs["median percentile"].percentiles.percents, [50, 90])
+
+        row = {
+            "min": {"min": 2, "max": 6},
+            "median percentile": {"values": {"50.0": 3, "90.0": 5.5}},
+            "other": {"max": 7}
+        }
+        pulled = {s.name: s.pull(row) for s in query.select}
+        self.assertEqual(pulled, {"min": 2, "max": 6, "median": 3, "p90": 5.5, "other": 7})
+
+    def test_union_terms(self):
+        query = _query([
+            Data(name="durations", value=Variable("duration"), aggregate="union"),
+            Data(name="flags", value=Variable("flag"), aggregate="union"),
+            Data(name="some", value=Variable("duration"), aggregate="union", limit=2)
+        ])
+        es_query, _ = compile_aggsop(_frum(), query)
+        duration, flag = encode_property(ES_COLUMN), encode_property("flag.~b~")
+        self.assertEqual(es_query.aggs, {
+            duration: {"terms": {"field": ES_COLUMN, "size": MAX_LIMIT}},
+            flag: {"terms": {"field": "flag.~b~", "size": MAX_LIMIT}},
+            duration + " 2": {"terms": {"field": ES_COLUMN, "size": 2}}
+        })
+
+        row = {
+            duration: {"sum_other_doc_count": 0, "buckets": [{"key": 1, "doc_count": 3}, {"key": 2.5, "doc_count": 1}]},
+            flag: {"sum_other_doc_count": 0, "buckets": [{"key": 1, "key_as_string": "true", "doc_count": 3}, {"key": 0, "key_as_string": "false", "doc_count": 1}]},
+            duration + " 2": {"sum_other_doc_count": 8, "buckets": [{"key": 1, "doc_count": 3}, {"key": 2.5, "doc_count": 1}]}
+        }
+        durations, flags, some = [s.pull(row) for s in query.select]
+        self.assertEqual(durations, [1, 2.5])
+        self.assertEqual(flags, [True, False])
+        self.assertIsInstance(flags[0], bool)
+
+        # MORE TERMS THAN FIT IN ONE RESPONSE
+        row[duration]["sum_other_doc_count"] = 7
+        self.assertRaises(Exception, query.select[0].pull, row)
+        self.assertEqual(some, [1, 2.5])  # TRUNCATION WAS ASKED FOR
+
+
+def _frum():
+    frum = Data(name="test")
+    frum.schema = Schema("test", [Column(
+        names={".": "duration"},
+        es_column=ES_COLUMN,
+        es_index="test",
+        type="number",
+        nested_path=["."]
+    ), Column(
+        names={".": "flag"},
+        es_column="flag.~b~",
+        es_index="test",
+        type="boolean",
+        nested_path=["."]
+    )])
+    return frum
+
+
+def _query(select):
+    return Data(select=select, where=TRUE, format="list")
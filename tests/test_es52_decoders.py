@@ -0,0 +1,146 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Author: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+
+from __future__ import division
+from __future__ import unicode_literals
+
+from mo_future import text_type
+
+from jx_base.domains import Domain
+from jx_base.schema import Schema
+from jx_elasticsearch.es52.decoders import AggsDecoder, TimeDecoder, DurationDecoder, RangeDecoder
+from jx_elasticsearch.es52.util import AGGS_FILTER_PATH, MSEARCH_FILTER_PATH
+from jx_elasticsearch.es52.expressions import Variable
+from jx_python.meta import Column
+from mo_dots import Data, wrap
+from mo_testing.fuzzytestcase import FuzzyTestCase
+from mo_times import Date, Duration
+from tests.speedtest_es_decode import filter_path
+
+ES_COLUMN = "run.timestamp.~n~"
+
+
+class TestES52Decoders(FuzzyTestCase):
+
+    def test_daily_time_edge_is_histogram(self):
+        decoder = _decoder({"type": "time", "min": "2015-01-01", "max": "2017-01-01", "interval": "day"})
+        self.assertIsInstance(decoder, TimeDecoder)
+
+        es_query = decoder.append_query(wrap({}), 0)
+        histogram = es_query.aggs._match.aggs._filter.histogram
+        self.assertEqual(histogram, {
+            "field": ES_COLUMN,
+            "interval": 86400,
+            "offset": 0,
+            "min_doc_count": 0,
+            "extended_bounds": {"min": Date("2015-01-01").unix, "max": Date("2016-12-31").unix}
+        })
+        self.assertEqual(es_query.aggs._match.range, None)
+
+        # EVERY BUCKET ES RETURNS MAPS TO ITS PARTITION
+        partitions = decoder.edge.domain.partitions
+        self.assertEqual(len(partitions), 731)
+        for p in partitions:
+            self.assertEqual(decoder.get_index([{"key": p.min.unix, "doc_count": 1}]), p.dataIndex)
+        self.assertEqual(decoder.get_index([{"doc_count": 1}]), len(partitions))  # _missing
+
+    def test_unaligned_time_edge(self):
+        decoder = _decoder({"type": "time", "min": "2017-01-01 06:00:00", "max": "2017-01-08 06:00:00", "interval": "day"})
+        histogram = decoder.append_query(wrap({}), 0).aggs._match.aggs._filter.histogram
+        self.assertEqual(histogram.offset, 6 * 60 * 60)
+
+        for p in decoder.edge.domain.partitions:
+            self.assertEqual(decoder.get_index([{"key": p.min.unix}]), p.dataIndex)
+
+    def test_monthly_time_edge_uses_ranges(self):
+        decoder = _decoder({"type": "time", "min": "2017-01-01", "max": "2018-01-01", "interval": "month"})
+        es_query = decoder.append_query(wrap({}), 0)
+        self.assertEqual(es_query.aggs._match.aggs, None)
+        self.assertEqual(len(es_query.aggs._match.range.ranges), 12)
+
+        for p in decoder.edge.domain.partitions:
+            bucket = {"from": p.min.unix, "to": p.max.unix}
+            self.assertEqual(decoder.get_index([bucket]), p.dataIndex)
+
+    def test_duration_edge_is_histogram(self):
+        decoder = _decoder({"type": "duration", "min": 0, "max": "hour", "interval": "minute"})
+        self.assertIsInstance(decoder, DurationDecoder)
+
+        histogram = decoder.append_query(wrap({}), 0).aggs._match.aggs._filter.histogram
+        self.assertEqual(histogram.interval, 60)
+        for p in decoder.edge.domain.partitions:
+            self.assertEqual(decoder.get_index([{"key": p.min.seconds}]), p.dataIndex)
+
+    def test_monthly_time_edge_through_filter_path(self):
+        decoder = _decoder({"type": "time", "min": "2017-01-01", "max": "2018-01-01", "interval": "month"})
+        decoder.append_query(wrap({}), 0)
+        buckets = _range_buckets(decoder.edge.domain.partitions, lambda v: v.unix)
+
+        for filtered in _filtered(buckets):
+            self.assertEqual(len(filtered), 12)
+            for p, bucket in zip(decoder.edge.domain.partitions, filtered):
+                self.assertEqual(decoder.get_index([bucket]), p.dataIndex)
+
+    def test_range_edge_through_filter_path(self):
+        decoder = _decoder({"type": "range", "min": 0, "max": 100, "interval": 10})
+        self.assertIsInstance(decoder, RangeDecoder)
+        decoder.append_query(wrap({}), 0)
+        buckets = _range_buckets(decoder.edge.domain.partitions, lambda v: v)
+
+        for filtered in _filtered(buckets):
+            for p, bucket in zip(decoder.edge.domain.partitions, filtered):
+                self.assertEqual(decoder.get_index([bucket]), p.dataIndex)
+
+
+def _range_buckets(partitions, to_float):
+    """
+    AN ES range AGGREGATION RESPONSE: THE key IS A STRING, THE BOUNDS ARE IN from AND to
+    """
+    return [
+        {
+            "key": text_type(float(to_float(p.min))) + "-" + text_type(float(to_float(p.max))),
+            "from": to_float(p.min),
+            "from_as_string": text_type(to_float(p.min)),
+            "to": to_float(p.max),
+            "to_as_string": text_type(to_float(p.max)),
+            "doc_count": 3
+        }
+        for p in partitions
+    ]
+
+
+def _filtered(buckets):
+    """
+    THE BUCKETS, AFTER ES APPLIES OUR filter_path TO THE search, AND TO THE _msearch, RESPONSES
+    """
+    response = {
+        "took": 5,
+        "_shards": {"total": 5, "successful": 5, "failed": 0},
+        "aggregations": {"_match": {"buckets": buckets}}
+    }
+    msearch = {"responses": [response]}
+    return [
+        wrap(filter_path(response, AGGS_FILTER_PATH)).aggregations._match.buckets,
+        wrap(filter_path(msearch, MSEARCH_FILTER_PATH)).responses[0].aggregations._match.buckets
+    ]
+
+
+def _decoder(domain):
+    schema = Schema("test", [Column(
+        names={".": "run.timestamp"},
+        es_column=ES_COLUMN,
+        es_index="test",
+        type="number",
+        nested_path=["."]
+    )])
+    query = Data()
+    query.frum.schema = schema
+    edge = Data(name="t", value=Variable("run.timestamp"), domain=Domain(**domain))
+    return AggsDecoder(edge, query, None)
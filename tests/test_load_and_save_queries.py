@@ -72,6 +72,42 @@ class TestLoadAndSaveQueries(BaseTestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.all_content, bytes)
 
+    def test_find_before_indexed(self):
+        test = {
+            "data": [
+                {"a": "c"}
+            ],
+            "query": {
+                "meta": {"save": True},
+                "from": TEST_TABLE,
+                "select": "a"
+            },
+            "expecting_list": {
+                "meta": {
+                    "format": "list"
+                },
+                "data": ["c"]
+            }
+        }
+
+        settings = self.utils.fill_container(test)
+
+        bytes = unicode2utf8(value2json({
+            "from": settings.index,
+            "select": "a",
+            "format": "list"
+        }))
+        expected_hash = convert.bytes2base64(hashlib.sha1(bytes).digest()[0:6]).replace("/", "_")
+        wrap(test).expecting_list.meta.saved_as = expected_hash
+
+        self.utils.send_queries(test)
+
+        # NO WAITING FOR ES: THE SAVED QUERY IS IN MEMORY
+        url = URL(self.utils.service_url)
+        response = self.utils.try_till_response(url.scheme + "://" + url.host + ":" + text_type(url.port) + "/find/" + expected_hash, data=b'')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.all_content, bytes)
+
     def test_recovery_of_empty_string(self):
 
         test = {
@@ -0,0 +1,60 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Author: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+
+from __future__ import division
+from __future__ import unicode_literals
+
+from mo_testing.fuzzytestcase import FuzzyTestCase
+from tests.loadgen import closed_loop, open_loop, summarize
+from tests.replay import StubES, Recording, Synthetic
+
+
+class TestLoadgen(FuzzyTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.stub = StubES(Recording(), Synthetic({}))
+        cls.url = "http://localhost:" + str(cls.stub.port)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.stub.stop()
+
+    def test_closed_loop(self):
+        samples = closed_loop(self.url, Fixed("/"), concurrency=4, duration=1)
+        summary = summarize(samples, 1)
+        self.assertGreater(summary.all.requests, 4)
+        self.assertEqual(summary.all.errors, 0)
+        self.assertEqual(summary.all.requests, summary.query.requests)
+        self.assertLessEqual(summary.query.latency.p50, summary.query.latency.p99)
+
+    def test_open_loop_rate(self):
+        samples = open_loop(self.url, Fixed("/"), rate=50, duration=2)
+        summary = summarize(samples, 2)
+        self.assertAlmostEqual(summary.all.requests, 100, delta=40)
+        self.assertEqual(summary.all.errors, 0)
+
+    def test_errors(self):
+        samples = closed_loop(self.url, Fixed("/no_such_thing"), concurrency=2, duration=0.5)
+        summary = summarize(samples, 0.5)
+        self.assertGreater(summary.all.errors, 0)
+        self.assertEqual(summary.all.errors, summary.all.requests)
+
+
+class Fixed(object):
+    """
+    THE SAME REQUEST, EVERY TIME
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def next(self):
+        return "query", "GET", self.path, None
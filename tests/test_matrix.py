@@ -0,0 +1,58 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Author: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+
+from __future__ import division
+from __future__ import unicode_literals
+
+from mo_collections.matrix import Matrix
+from mo_dots import Null
+from mo_testing.fuzzytestcase import FuzzyTestCase
+
+
+class TestMatrix(FuzzyTestCase):
+
+    def test_write_through_row(self):
+        m = Matrix(dims=(2, 3), zeros=0)
+        m[0, 1] = 5
+        row = m[1]
+        row[2] = 7
+        self.assertEqual(m[1, 2], 7)
+        self.assertEqual(m.cube, [[0, 5, 0], [0, 0, 7]])
+
+    def test_write_through_slice(self):
+        m = Matrix(dims=(2, 3), zeros=None)
+        m[1, 1] = 4
+        column = m[None, 1]
+        self.assertEqual(list(column.cube), [Null, 4])
+        sub = m[slice(0, 2), None]
+        sub.cube[0][2] = 9
+        self.assertEqual(m[0, 2], 9)
+
+    def test_ints_stay_exact(self):
+        big = 2 ** 53 + 1
+        m = Matrix(dims=(3,), zeros=None)
+        m[0] = big
+        m[1] = 0.5
+        self.assertEqual(m[0], big)
+        self.assertIsInstance(m[0], int)
+        self.assertEqual(m[1], 0.5)
+        self.assertEqual(m[2], Null)
+
+        m = Matrix(dims=(2,), zeros=0.0)
+        m[0] = big
+        self.assertEqual(m[0], big)
+
+    def test_typed_until_mixed(self):
+        m = Matrix(dims=(2, 2), zeros=None)
+        m[0, 0] = 1.5  # ALL null, SO THE BUFFER CAN BECOME float
+        m[1, 1] = 2.5
+        self.assertTrue(m._values is not None)
+        self.assertEqual([v for _, v in m], [1.5, Null, Null, 2.5])
+        self.assertEqual(m.aggregate("max"), 2.5)
@@ -0,0 +1,79 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Author: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+
+from __future__ import division
+from __future__ import unicode_literals
+
+import os
+from tempfile import mkdtemp
+
+from active_data.actions import metrics
+from active_data.actions.metrics import Metrics, Histogram, BUCKETS
+from mo_files import File
+from mo_testing.fuzzytestcase import FuzzyTestCase
+from mo_threads import Till
+
+
+class TestMetrics(FuzzyTestCase):
+
+    def setUp(self):
+        self.directory = File(mkdtemp())
+
+    def tearDown(self):
+        self.directory.delete()
+
+    def test_buckets(self):
+        h = Histogram()
+        h.add(0.0005)
+        h.add(0.001)
+        h.add(0.0011)
+        h.add(10 * 60 * 60)
+        self.assertEqual(h.counts[0], 2)  # UP TO, AND INCLUDING, 1ms
+        self.assertEqual(h.counts[1], 1)
+        self.assertEqual(h.counts[len(BUCKETS)], 1)  # +Inf
+        self.assertAlmostEqual(h.sum, 36000.0026)
+
+    def test_workers_add_up(self):
+        worker = Metrics(directory=self.directory.abspath, flush=3600)
+        worker.add("aggs", "unittest", {"es": 0.2, "decode": 0.01})
+        worker.flush()
+        # PRETEND THAT FILE CAME FROM ANOTHER WORKER, AND START OVER
+        mine = File.new_instance(self.directory, metrics._worker_name() + ".json").abspath
+        os.rename(mine, File.new_instance(self.directory, "worker_other.json").abspath)
+
+        worker = Metrics(directory=self.directory.abspath, flush=3600)
+        worker.add("aggs", "unittest", {"es": 0.3})
+        worker.add("set", "unittest", {"es": 0.3})
+
+        histograms = worker.collect()
+        self.assertEqual(sum(histograms[("es", "aggs", "unittest")].counts), 2)
+        self.assertAlmostEqual(histograms[("es", "aggs", "unittest")].sum, 0.5)
+        self.assertEqual(sum(histograms[("decode", "aggs", "unittest")].counts), 1)
+        self.assertEqual(sum(histograms[("es", "set", "unittest")].counts), 1)
+
+    def test_reused_pid(self):
+        name = metrics._worker_name()
+        self.assertEqual(metrics._worker_name(), name)
+        self.assertTrue(name.startswith("worker_" + str(os.getpid()) + "_"))
+
+        # A LATER PROCESS WITH THE SAME PID
+        metrics._worker = (None, None)
+        Till(seconds=0.01).wait()
+        self.assertNotEqual(metrics._worker_name(), name)
+
+    def test_prometheus(self):
+        worker = Metrics()
+        worker.add("aggs", "unittest", {"es": 0.0015})
+        lines = worker.prometheus().split("\n")
+
+        self.assertIn('activedata_query_stage_seconds_bucket{stage="es",type="aggs",index="unittest",le="0.001"} 0', lines)
+        self.assertIn('activedata_query_stage_seconds_bucket{stage="es",type="aggs",index="unittest",le="0.002"} 1', lines)
+        self.assertIn('activedata_query_stage_seconds_bucket{stage="es",type="aggs",index="unittest",le="+Inf"} 1', lines)
+        self.assertIn('activedata_query_stage_seconds_count{stage="es",type="aggs",index="unittest"} 1', lines)
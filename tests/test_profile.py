@@ -0,0 +1,52 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Author: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+
+from __future__ import division
+from __future__ import unicode_literals
+
+import os
+from tempfile import mkdtemp
+from time import time
+
+from active_data.actions import metrics
+from active_data.actions.profile import Sampler
+from mo_files import File
+from mo_testing.fuzzytestcase import FuzzyTestCase
+
+
+class TestProfile(FuzzyTestCase):
+
+    def setUp(self):
+        self.directory = File(mkdtemp())
+
+    def tearDown(self):
+        self.directory.delete()
+
+    def test_reused_pid(self):
+        # A DEAD WORKER WITH OUR PID
+        dead = File.new_instance(self.directory, "worker_" + str(os.getpid()) + "_0.txt")
+        dead.write("dead;stack 3")
+
+        sampler = Sampler(directory=self.directory.abspath, flush=60, keep=3600)
+        sampler.profiler.stop()
+        self.assertEqual(sampler.collect().get("dead;stack"), 3)
+        self.assertTrue(dead.exists)
+        self.assertTrue(File.new_instance(self.directory, metrics._worker_name() + ".txt").exists)
+
+    def test_expire_dead_workers(self):
+        dead = File.new_instance(self.directory, "worker_1_0.txt")
+        dead.write("dead;stack 3")
+        then = time() - 2 * 3600
+        os.utime(dead.abspath, (then, then))
+
+        sampler = Sampler(directory=self.directory.abspath, flush=60, keep=3600)
+        sampler.profiler.stop()
+        self.assertEqual(sampler.collect().get("dead;stack"), None)
+        self.assertFalse(dead.exists)
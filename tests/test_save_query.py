@@ -0,0 +1,113 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Author: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+
+from __future__ import division
+from __future__ import unicode_literals
+
+import hashlib
+
+from active_data.actions.save_query import SaveQueries
+from jx_python.containers.doc_store import DocStore
+from mo_dots import Data, wrap
+from mo_testing.fuzzytestcase import FuzzyTestCase
+from mo_times.dates import Date
+from pyLibrary import convert
+
+
+class TestSaveQuery(FuzzyTestCase):
+
+    def setUp(self):
+        # THE saved_queries INDEX, IN MEMORY
+        self.store = SavedQueries()
+        self.finder = object.__new__(SaveQueries)
+        self.finder.es = self.finder.queue = self.store
+        self.finder._setup_cache(cache_size=3, last_used_period=3600)
+
+    def tearDown(self):
+        self.finder.updater.stop()
+        self.finder.updater.join()
+
+    def test_save_then_find(self):
+        query = {"from": "unittest", "select": "a"}
+        json = convert.value2json(query)
+        expected_hash = convert.bytes2base64(hashlib.sha1(convert.unicode2utf8(json)).digest()[0:6]).replace("/", "_")
+
+        hash = self.finder.save(wrap(query))
+        self.assertEqual(hash, expected_hash)
+        self.assertEqual(self.store.data, [{"hash": hash, "query": json, "create_time": self.store.data[0]["create_time"], "last_used": self.store.data[0]["last_used"]}])
+
+        # SAVING AGAIN, AND FINDING, IS DONE FROM MEMORY
+        self.store.num_queries = 0
+        self.assertEqual(self.finder.save(wrap(query)), hash)
+        self.assertEqual(self.finder.find(hash), json)
+        self.assertEqual(self.finder.find(hash), json)
+        self.assertEqual(self.store.num_queries, 0)
+
+    def test_find_from_index(self):
+        self.store.add({"id": "abc", "value": {"hash": "abcdefgh", "query": "{\"from\":\"a\"}", "last_used": 0}})
+        self.store.add({"id": "xyz", "value": {"hash": "xyzxyzxy", "query": "{\"from\":\"x\"}", "last_used": 0}})
+
+        self.assertEqual(self.finder.find("abc"), "{\"from\":\"a\"}")  # BY PREFIX
+        self.assertEqual(self.finder.find("abcdefgh"), "{\"from\":\"a\"}")
+        self.assertEqual(self.store.num_queries, 1)
+        self.assertEqual(self.finder.find("nothing"), None)
+
+        # last_used IS SET LATER, FOR ALL AT ONCE
+        self.finder.find("xyzxyzxy")
+        self.assertEqual([d["last_used"] for d in self.store.data], [0, 0])
+        self.store.num_updates = 0
+        self.finder.update_last_used()
+        self.assertEqual(self.store.num_updates, 1)
+        self.assertGreater(min(d["last_used"] for d in self.store.data), 0)
+
+    def test_collision(self):
+        query = {"from": "unittest", "select": "b"}
+        json = convert.value2json(query)
+        hashes = []
+        hash = convert.unicode2utf8(json)
+        for _ in range(2):
+            hash = hashlib.sha1(hash).digest()
+            hashes.append(convert.bytes2base64(hash[0:6]).replace("/", "_"))
+        self.store.add({"id": hashes[0], "value": {"hash": hashes[0], "query": "{\"other\":\"query\"}"}})
+
+        self.assertEqual(self.finder.save(wrap(query)), hashes[1])
+        self.assertEqual(self.finder.find(hashes[0]), "{\"other\":\"query\"}")
+
+    def test_cache_size(self):
+        for i in range(5):
+            self.finder.save(wrap({"from": "unittest", "select": "a" + str(i)}))
+        self.assertEqual(len(self.finder.cache), 3)
+
+
+class SavedQueries(DocStore):
+    """
+    THE saved_queries INDEX, TAKING THE RECORDS OF THE ES BULK QUEUE
+    """
+
+    def __init__(self):
+        DocStore.__init__(self, "saved_queries", uid="hash")
+        self.settings = Data()
+        self.num_queries = 0
+        self.num_updates = 0
+
+    def add(self, record):
+        DocStore.add(self, {k: v.unix if isinstance(v, Date) else v for k, v in record["value"].items()})
+
+    def query(self, query):
+        self.num_queries += 1
+        query = dict(query)
+        query["from"] = self
+        return DocStore.query(self, query)
+
+    def update(self, command):
+        self.num_updates += 1
+        command = dict(command)
+        command["set"] = {k: v.unix if isinstance(v, Date) else v for k, v in command["set"].items()}
+        DocStore.update(self, command)
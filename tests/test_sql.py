@@ -74,6 +74,47 @@ class TestSQL(BaseTestCase):
         result = self._run_sql_query(sql)
         compare_to_expected(result.meta.jx_query, result, expected, places=6)
 
+    def test_min_max_avg(self):
+        self._assert_same_as_jx(
+            'select min(v) as lo, max(v) as hi, avg(v) as mean, sum(v) as total from '+TEST_TABLE,
+            {"select": [
+                {"name": "lo", "value": "v", "aggregate": "minimum"},
+                {"name": "hi", "value": "v", "aggregate": "maximum"},
+                {"name": "mean", "value": "v", "aggregate": "average"},
+                {"name": "total", "value": "v", "aggregate": "sum"}
+            ]}
+        )
+
+    def test_count_distinct(self):
+        self._assert_same_as_jx(
+            'select count(*) as n, count(v) as c, count(distinct a) as d from '+TEST_TABLE,
+            {"select": [
+                {"name": "n", "aggregate": "count"},
+                {"name": "c", "value": "v", "aggregate": "count"},
+                {"name": "d", "value": "a", "aggregate": "cardinality"}
+            ]}
+        )
+
+    def test_percentile(self):
+        self._assert_same_as_jx(
+            'select a, median(v) as m, percentile(v, 0.9) as p90 from '+TEST_TABLE+' group by a',
+            {
+                "groupby": "a",
+                "select": [
+                    {"name": "m", "value": "v", "aggregate": "median"},
+                    {"name": "p90", "value": "v", "aggregate": "percentile", "percentile": 0.9}
+                ]
+            }
+        )
+
+    def test_stddev(self):
+        self._assert_same_as_jx(
+            'select stddev(v) as s, variance(v) as var from '+TEST_TABLE,
+            {"select": [
+                {"name": "s", "value": "v", "aggregate": "stddev"},
+                {"name": "var", "value": "v", "aggregate": "variance"}
+            ]}
+        )
 
     def execute(self, test):
         test = wrap(test)
@@ -94,3 +135,20 @@ class TestSQL(BaseTestCase):
         self.assertEqual(response.status_code, 200)
         return json2value(utf82unicode(response.all_content))
 
+    def _assert_same_as_jx(self, sql, jx_query):
+        """
+        THE sql MUST GIVE THE SAME RESULT AS THE EQUIVALENT jx_query
+        """
+        test = Data(data=simple_test_data, query=jx_query)
+        test.query["from"] = TEST_TABLE
+        test.query.format = "table"
+        self.utils.fill_container(test)
+        expected = self.utils.execute_query(test.query)
+
+        result = self._run_sql_query(sql)
+        compare_to_expected(result.meta.jx_query, result, {
+            "meta": {"format": "table"},
+            "header": expected.header,
+            "data": expected.data
+        }, places=6)
+
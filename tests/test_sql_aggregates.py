@@ -0,0 +1,99 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Author: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+
+from __future__ import division
+from __future__ import unicode_literals
+
+from random import Random
+
+from active_data.actions.sql import parse_sql
+from jx_python.containers.doc_store import DocStore
+from mo_dots import unwrap
+from mo_testing.fuzzytestcase import FuzzyTestCase
+
+NUM_ROWS = 1000
+
+# EACH SQL STATEMENT, AND THE jx QUERY IT MUST MEAN
+PAIRS = [
+    (
+        "select count(*) as n, count(v) as c, count(distinct a) as d from t",
+        {"select": [
+            {"name": "n", "aggregate": "count"},
+            {"name": "c", "value": "v", "aggregate": "count"},
+            {"name": "d", "value": "a", "aggregate": "cardinality"}
+        ]}
+    ),
+    (
+        "select a, min(v) as lo, max(v) as hi, sum(v) as total, avg(v) as mean from t group by a",
+        {
+            "groupby": "a",
+            "select": [
+                {"name": "lo", "value": "v", "aggregate": "minimum"},
+                {"name": "hi", "value": "v", "aggregate": "maximum"},
+                {"name": "total", "value": "v", "aggregate": "sum"},
+                {"name": "mean", "value": "v", "aggregate": "average"}
+            ]
+        }
+    ),
+    (
+        "select a, median(v) as m, percentile(v, 0.9) as p90, cardinality(b) as bs from t where v > 10 group by a",
+        {
+            "groupby": "a",
+            "where": {"gt": {"v": 10}},
+            "select": [
+                {"name": "m", "value": "v", "aggregate": "median"},
+                {"name": "p90", "value": "v", "aggregate": "percentile", "percentile": 0.9},
+                {"name": "bs", "value": "b", "aggregate": "cardinality"}
+            ]
+        }
+    )
+]
+
+
+class TestSQLAggregates(FuzzyTestCase):
+
+    def test_parity(self):
+        store = DocStore("t", _data())
+        for sql, jx_query in PAIRS:
+            query = parse_sql(sql)
+            query["from"] = store
+            result = store.query(query)
+
+            jx_query = dict(jx_query, **{"from": store, "format": "table"})
+            expected = store.query(jx_query)
+            self.assertEqual(unwrap(result.header), unwrap(expected.header), sql)
+            self.assertAlmostEqual(unwrap(result.data), unwrap(expected.data), places=6, msg=sql)
+
+    def test_values(self):
+        store = DocStore("t", [{"a": "x", "v": 1}, {"a": "y", "v": 5}, {"a": "x", "v": 3}, {"v": 2}])
+        query = parse_sql("select count(*) as n, count(distinct a) as d, max(v) as hi, stddev(v) as s from t")
+        self.assertEqual(query.select[3], {"name": "s", "value": "v", "aggregate": "stddev"})
+        query.select = [s for s in query.select if s.aggregate != "stddev"]  # NO stddev IN jx_python
+        query["from"] = store
+        result = store.query(query)
+        self.assertEqual(result.header, ["n", "d", "hi"])
+        self.assertEqual(result.data, [[4, 2, 5]])
+
+    def test_bad_aggregates(self):
+        self.assertRaises(Exception, parse_sql, "select percentile(v) from t")
+        self.assertRaises(Exception, parse_sql, "select sum(distinct v) from t")
+        self.assertRaises(Exception, parse_sql, "select max(v, w) from t")
+
+
+def _data():
+    rng = Random(42)
+    return [
+        {
+            "a": rng.choice(["x", "y", "z", None]),
+            "b": rng.randint(0, 20),
+            "v": rng.choice([None, rng.randint(0, 100), rng.random() * 100])
+        }
+        for _ in range(NUM_ROWS)
+    ]
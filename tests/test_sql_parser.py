@@ -0,0 +1,186 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Author: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+
+from __future__ import division
+from __future__ import unicode_literals
+
+from random import Random
+
+import moz_sql_parser
+from moz_sql_parser import fast_parser, _scrub
+from moz_sql_parser.fast_parser import Unsupported
+from moz_sql_parser.sql_parser import SQLParser
+from mo_future import text_type
+from mo_testing.fuzzytestcase import FuzzyTestCase
+from mo_threads import Thread
+from tests.test_jx import TEST_TABLE
+
+NUM_RANDOM = 30  # pyparsing IS SLOW
+
+# THE STATEMENTS IN tests/test_sql.py
+TEST_SQL = [
+    'select a as "a", count(1) as "count" from ' + TEST_TABLE + ' group by a',
+    'select * from ' + TEST_TABLE + ' where v>=3',
+    "SELECT 1"
+]
+
+# THE GRAMMAR'S QUIRKS, WHICH fast_parser MUST REPEAT
+SUPPORTED = [
+    "select a - b + c from t",
+    "select a or b and c or d",
+    "select a = null, null = a, a <> null, a = (null), a is not null",
+    "select -1 + 2, not a = 1 and b = 2",
+    "select 010, 1e5, 1., .5, 'it''s', \"quoted\".x",
+    "select f(), g(1), h(1,2), h((1,2)), count(distinct a)",
+    "select a from t x, u as y join v on t.a=v.a inner join w cross join z",
+    "select a from t join u as x on 0 join v y",
+    "select a from t limit 5",
+    "select a from t limit 5 order by a limit 0",
+    "select a from t order by a desc, b limit 6",
+    "select a between 1 and 2 from t",
+    "select a * b + c * d, a ** b, t.* from t",
+    "select a = b == c, a > b >= c, a<-1, a <> b from t",
+    "select 1 limit 0",
+    "select a from t where 0",
+    "select count(*) from t where a in (1, 2, 3) and b is null",
+    "select a - -1 + 2, -(1,2)",
+    "select * x from t",
+    "select a null, b not from t",
+    "select max(x) y from t having y > 2",
+    'SELECT A.B AS "X.Y" FROM "T" WHERE "A"=\'x\' GROUP BY A.B HAVING COUNT(*)>1 ORDER BY 1 DESC LIMIT 10'
+]
+
+# LEFT TO pyparsing
+UNSUPPORTED = [
+    "select a --1",
+    "select a # comment",
+    "select 1a",
+    "select a from t group  by a",
+    "select case when a=1 then 2 else 3 end from t",
+    "select a from t union select b from u",
+    "select a collate nocase from t",
+    "select a from (select b from t)",
+    "select a between 1 and 2 between 3 and 4",
+    "select my_func(a) from t",
+    "select a from t where",
+    "select 99999999999999999999"
+]
+
+
+class TestSQLParser(FuzzyTestCase):
+
+    def test_corpus(self):
+        for sql in TEST_SQL + SUPPORTED:
+            self.assertEqual(_scrub(fast_parser.parse(sql)), _pyparsing(sql), "different result for " + sql)
+
+    def test_unsupported(self):
+        for sql in UNSUPPORTED:
+            self.assertRaises(Unsupported, fast_parser.parse, sql)
+
+        # THE FALLBACK GIVES THE pyparsing RESULT
+        self.assertEqual(moz_sql_parser.parse(UNSUPPORTED[0]), {"select": {"value": "a"}})
+        self.assertEqual(moz_sql_parser.parse(UNSUPPORTED[5]), {"union": [{"select": {"value": "a"}, "from": "t"}, {"select": {"value": "b"}, "from": "u"}]})
+        self.assertRaises(Exception, moz_sql_parser.parse, UNSUPPORTED[9])
+
+    def test_random(self):
+        rng = Random(42)
+        num_parsed = 0
+        for _ in range(NUM_RANDOM):
+            sql = _random_statement(rng)
+            try:
+                result = _scrub(fast_parser.parse(sql))
+            except Unsupported:
+                continue
+            num_parsed += 1
+            self.assertEqual(result, _pyparsing(sql), "different result for " + sql)
+        self.assertGreater(num_parsed, NUM_RANDOM / 2)
+
+    def test_cache(self):
+        sql = "select a, b from t where c = 1"
+        first = moz_sql_parser.parse(sql)
+        first["select"].append({"value": "mutated"})
+        second = moz_sql_parser.parse("  " + sql + "\n")
+        self.assertEqual(second, {"select": [{"value": "a"}, {"value": "b"}], "from": "t", "where": {"eq": ["c", 1]}})
+        self.assertIn(sql, moz_sql_parser._cache)
+
+    def test_concurrent_errors(self):
+        # EACH THREAD MUST GET ITS OWN ERROR HINTS
+        statements = ["select a from t where", "select a from t group by", "select a, from t", "select a from t order by"]
+        errors = {}
+
+        def parse(sql, please_stop):
+            try:
+                moz_sql_parser.parse(sql)
+            except Exception as e:
+                errors[sql] = e
+
+        threads = [Thread.run(sql, parse, sql) for sql in statements]
+        for t in threads:
+            t.join()
+        for sql in statements:
+            self.assertEqual(text_type(errors[sql]), text_type(_pyparsing_error(sql)), "different error for " + sql)
+
+
+def _pyparsing_error(sql):
+    try:
+        moz_sql_parser._parse(sql)
+    except Exception as e:
+        return e
+
+
+def _pyparsing(sql):
+    return _scrub(SQLParser.parseString(sql, parseAll=True))
+
+
+NAMES = ["a", "b", "t.a", "A_1", "x$y", '"q"', '"a.b"', "t.*", "null", "group", "count"]
+LITERALS = ["0", "1", "1.5e3", ".5", "'a'", "'it''s'"]
+OPERATORS = ["||", "*", "/", "+", "-", "<>", ">", "<", ">=", "<=", "in", "is", "=", "==", "!=", "or", "and", "is not"]
+
+
+def _random_expression(rng, depth=0):
+    r = rng.random()
+    if depth > 1 or r < 0.4:
+        output = rng.choice(NAMES)
+    elif r < 0.6:
+        output = rng.choice(LITERALS)
+    elif r < 0.7:
+        output = rng.choice(["-", "not ", "distinct "]) + _random_expression(rng, depth + 1)
+    elif r < 0.8:
+        output = "(" + ", ".join(_random_expression(rng, depth + 1) for _ in range(rng.randint(1, 2))) + ")"
+    elif r < 0.9:
+        output = rng.choice(["count", "sum", "F"]) + "(" + ", ".join(_random_expression(rng, depth + 1) for _ in range(rng.randint(0, 2))) + ")"
+    else:
+        output = rng.choice(NAMES) + " between " + rng.choice(LITERALS) + " and " + rng.choice(NAMES)
+    for _ in range(rng.randint(0, 2 - min(depth, 1))):
+        output += rng.choice([" ", ""]) + rng.choice(OPERATORS) + " " + _random_expression(rng, depth + 1)
+    return output
+
+
+def _random_statement(rng):
+    columns = ", ".join(
+        _random_expression(rng) + rng.choice(["", "", " as x", " y"])
+        for _ in range(rng.randint(1, 2))
+    )
+    output = "select " + columns
+    if rng.random() < 0.8:
+        output += " from " + rng.choice(["t", "t x", '"my.table" as y', "t, u"])
+        if rng.random() < 0.3:
+            output += " " + rng.choice(["join", "inner join", "cross join"]) + " u on " + _random_expression(rng)
+        if rng.random() < 0.5:
+            output += " where " + _random_expression(rng)
+        if rng.random() < 0.3:
+            output += " group by " + rng.choice(NAMES)
+            if rng.random() < 0.5:
+                output += " having " + _random_expression(rng)
+    if rng.random() < 0.3:
+        output += " order by " + _random_expression(rng) + rng.choice(["", " desc"])
+    if rng.random() < 0.2:
+        output += " limit " + rng.choice(LITERALS)
+    return output
@@ -0,0 +1,101 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Author: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+
+from __future__ import division
+from __future__ import unicode_literals
+
+from jx_base.dimensions import Dimension
+from mo_dots import Data
+from mo_testing.fuzzytestcase import FuzzyTestCase
+from mo_threads import Lock, Tasks, Till
+from mo_times.timer import Timer
+
+
+class TestTasks(FuzzyTestCase):
+
+    def test_concurrent(self):
+        def slow(value):
+            Till(seconds=0.5).wait()
+            return value
+
+        with Timer("four slow tasks") as timer:
+            with Tasks("test") as tasks:
+                a = tasks.add("a", slow, 1)
+                b = tasks.add("b", slow, 2)
+                tasks.add("c", slow, 3)
+                tasks.add("d", slow, 4)
+
+        self.assertEqual(tasks.join(), [1, 2, 3, 4])
+        self.assertEqual((a.join(), b.join()), (1, 2))
+        self.assertLess(timer.duration.seconds, 1.5)
+        self.assertEqual(set(tasks.timing.keys()), {"a", "b", "c", "d"})
+        self.assertGreater(tasks.timing.a, 0.4)
+
+    def test_bounded(self):
+        locker = Lock()
+        running = [0, 0]  # (CURRENT, MAXIMUM)
+
+        def work(please_stop=None):
+            with locker:
+                running[0] += 1
+                running[1] = max(running)
+            Till(seconds=0.1).wait()
+            with locker:
+                running[0] -= 1
+
+        with Tasks("test", max_threads=2) as tasks:
+            for i in range(6):
+                tasks.add("work" + str(i), work)
+
+        self.assertEqual(running, [0, 2])
+
+    def test_failure(self):
+        def fail():
+            raise Exception("expected failure")
+
+        tasks = Tasks("test")
+        good = tasks.add("good", lambda: 42)
+        bad = tasks.add("bad", fail)
+
+        self.assertEqual(good.join(), 42)
+        self.assertRaises(Exception, bad.join)
+        self.assertRaises(Exception, tasks.join)
+
+    def test_dimension_threads(self):
+        # THREE PARTS, EACH WITH THREE SUB-PARTS
+        dim = {"name": "top", "edges": [
+            {"name": "a" + str(i), "edges": [{"name": "b" + str(j)} for j in range(3)]}
+            for i in range(3)
+        ]}
+        jx = SlowContainer()
+        top = Dimension(dim, None, jx)
+
+        self.assertEqual([top.edges["top.a" + str(i)].name for i in range(3)], ["a0", "a1", "a2"])
+        self.assertEqual(jx.running, [0, 3])  # NO MORE THREADS THAN TOP-LEVEL PARTS
+
+
+class SlowContainer(object):
+    """
+    EVERY Dimension ASKS FOR THE DEFAULT settings; COUNT HOW MANY DO SO AT ONCE
+    """
+
+    def __init__(self):
+        self.locker = Lock()
+        self.running = [0, 0]  # (CURRENT, MAXIMUM)
+
+    @property
+    def settings(self):
+        with self.locker:
+            self.running[0] += 1
+            self.running[1] = max(self.running)
+        Till(seconds=0.1).wait()
+        with self.locker:
+            self.running[0] -= 1
+        return Data(index="test")